@@ -15,15 +15,23 @@ import json         # For pretty printing JSON output
 import time         # For simulated delays and auto-refresh
 from datetime import datetime, timezone, timedelta # For timestamp conversion and date ranges
 import pandas as pd # For data manipulation
-import plotly.express as px # For interactive charts
-from collections import Counter # For counting addresses
-import google.generativeai as genai # For Gemini Chat
+import numpy as np  # For fixed-point int64 amount columns
 import re           # For cleaning markdown
 import requests     # For making HTTP requests (NewsAPI)
 from requests.exceptions import HTTPError, RequestException # Error handling for RPC and API calls
+from requests.adapters import HTTPAdapter # Connection pooling for the RPC session
+from urllib3.util.retry import Retry # Transient-status retries for the RPC session
 import streamlit.components.v1 as components # For displaying pyvis graph HTML
-from pyvis.network import Network # For Network Graph Visualization
 import math # For ceiling function in batching
+import os # For locating bundled assets
+from functools import lru_cache, partial # lru_cache memoizes address checksums; partial defers CSV export encoding
+from concurrent.futures import ThreadPoolExecutor # For overlapping independent RPC lookups
+import sqlite3 # For the on-disk RPC response cache
+import threading # Guards the shared sqlite connection across worker threads
+try:
+    import orjson # Optional: faster JSON decoding for large eth_getLogs / NewsAPI payloads
+except ImportError:
+    orjson = None
 
 # --- Early Configuration: MUST BE FIRST STREAMLIT COMMAND ---
 st.set_page_config(
@@ -42,6 +50,8 @@ st.set_page_config(
 # endpoint = "YOUR_GOOGLE_CLOUD_BLOCKCHAIN_RPC_ENDPOINT"
 # [newsapi]
 # api_key = "YOUR_NEWSAPI_ORG_KEY"
+# [network_graph] # Optional
+# cdn_resources = "in_line" # Embed vis.js in every graph (offline use); default "remote" loads it from cdnjs
 
 # Fetch secrets with robust error handling
 try:
@@ -66,6 +76,12 @@ except (AttributeError, KeyError):
     st.error("🚨 **Config Error:** NewsAPI Key (`newsapi.api_key`) missing/empty. News Feed disabled.", icon="⚙️")
     NEWSAPI_API_KEY = None
 
+try:
+    GRAPH_CDN_RESOURCES = st.secrets["network_graph"]["cdn_resources"]
+    if GRAPH_CDN_RESOURCES not in ("remote", "in_line"): raise KeyError
+except (AttributeError, KeyError):
+    GRAPH_CDN_RESOURCES = "remote" # vis.js comes from cdnjs (browser-cached) instead of ~750KB inline per render
+
 
 PYUSD_CONTRACT_ADDRESS_NON_CHECKSUM = "0x6c3ea9036406852006290770bedfcaba0e23a0e8"
 SIMULATED_IMPLANT_ID = "implant_user_cyber_777"
@@ -94,9 +110,23 @@ PYUSD_ABI_EXPANDED = [
     # {"constant": True,"inputs": [],"name": "isPaused","outputs": [{"name": "", "type": "bool"}],"payable": False,"stateMutability": "view","type": "function"},
 ]
 
+# **Event Topic Hashes**
+# topic0 of each event log is keccak256 of the event signature. Precomputed once so a
+# single eth_getLogs call can OR-filter on all event types and dispatch locally.
+# !!! Keep signatures in sync with the event entries in PYUSD_ABI_EXPANDED !!!
+EVENT_SIGNATURES = {
+    "Transfer": "Transfer(address,address,uint256)",
+    "Approval": "Approval(address,address,uint256)",
+    "Mint": "Mint(address,uint256)",
+    "Burn": "Burn(address,uint256)",
+}
+EVENT_TOPICS = {name: Web3.to_hex(Web3.keccak(text=sig)) for name, sig in EVENT_SIGNATURES.items()}
+TOPIC_TO_EVENT = {topic: name for name, topic in EVENT_TOPICS.items()}
+
 # --- System Instruction for Gemini ---
 # Updated to reflect new features
-SYSTEM_INSTRUCTION = f"""You are the PYUSD CyberMatrix AI Assistant v2.0, integrated into an advanced Streamlit dashboard.
+# Plain template: the date is filled in when the model is configured (see configure_gemini)
+SYSTEM_INSTRUCTION_TEMPLATE = """You are the PYUSD CyberMatrix AI Assistant v2.0, integrated into an advanced Streamlit dashboard.
 The dashboard utilizes Google Cloud Platform's Blockchain RPC for Ethereum data and NewsAPI for news feeds.
 Your purpose is to provide helpful and informative responses regarding PayPal USD (PYUSD), blockchain technology (especially Ethereum via GCP RPC), stablecoins, and relate answers back to the dashboard's functionalities.
 Dashboard functionalities include:
@@ -118,27 +148,207 @@ You can answer general questions about:
 - Dashboard Tabs: Explain their function conceptually (Live Feeds, Analysis, Tools, Historical, Contract, News, Sim, Watchlist), noting reliance on GCP RPC and NewsAPI.
 - AI Features: Explain the AI summary and news sentiment features (powered by Gemini).
 Keep responses well-formatted using markdown.
-Today's date is {datetime.now().strftime('%A, %B %d, %Y')}. Use this date for context.
+Today's date is {today}. Use this date for context.
 """
 
+# --- Address Checksum Cache ---
+# EIP-55 checksumming costs a keccak per call; the same few thousand addresses repeat on every rerun
+ADDRESS_CACHE_SIZE = 1 << 16 # Distinct addresses memoized; wide historical scans easily exceed 16k counterparties
+
+@lru_cache(maxsize=ADDRESS_CACHE_SIZE)
+def to_checksum(address):
+    """Memoized Web3.to_checksum_address (raises ValueError for invalid addresses, like the original)."""
+    return Web3.to_checksum_address(address)
+
+_HEX_ADDRESS = re.compile(r"(?:0[xX])?[0-9a-fA-F]{40}") # Shape check only; mixed-case checksums still go through Web3
+_HEX_HASH = re.compile(r"0x[0-9a-fA-F]{64}") # Tx/block hashes: rejects non-hex input before it reaches the RPC
+
+@lru_cache(maxsize=ADDRESS_CACHE_SIZE)
+def is_valid_address(address):
+    """Memoized Web3.is_address for strings; malformed input is rejected by the regex without a keccak."""
+    return isinstance(address, str) and _HEX_ADDRESS.fullmatch(address) is not None and Web3.is_address(address)
+
 # --- Known Addresses for Tagging (Feature 6) ---
 # Add more known addresses (exchanges, protocols, whales, PYUSD contract itself)
 # Use checksummed addresses
 KNOWN_ADDRESSES = {
-    Web3.to_checksum_address("0x6c3ea9036406852006290770bedfcaba0e23a0e8"): "PYUSD Contract",
+    to_checksum("0x6c3ea9036406852006290770bedfcaba0e23a0e8"): "PYUSD Contract",
     # Add more like:
-    # Web3.to_checksum_address("0x742d35Cc6634C0532925a3b844Bc454e4438f44e"): "Kraken Exchange",
-    # Web3.to_checksum_address("0x...") : "Binance Exchange",
+    # to_checksum("0x742d35Cc6634C0532925a3b844Bc454e4438f44e"): "Kraken Exchange",
+    # to_checksum("0x...") : "Binance Exchange",
 }
+KNOWN_LABEL_TO_ADDRESS = {label.lower(): addr for addr, label in KNOWN_ADDRESSES.items()} # Reverse map for label lookups
 
 # --- Initialize Web3 Connection ---
+RPC_POOL_SIZE = 32 # Keep-alive connections kept open to the RPC endpoint
+
+def _make_rpc_session():
+    """Builds a pooled keep-alive requests.Session for JSON-RPC traffic.
+    Retries transient gateway/rate-limit statuses only (JSON-RPC reads are safe to resend);
+    read timeouts and the final bad status are left to the callers (see fetch_logs_chunked)."""
+    retry = Retry(total=3, connect=3, read=0, status=3, backoff_factor=0.3,
+                  status_forcelist=[429, 502, 503, 504], allowed_methods=frozenset({"POST"}),
+                  raise_on_status=False) # Return the last response so raise_for_status() yields HTTPError
+    adapter = HTTPAdapter(pool_connections=RPC_POOL_SIZE, pool_maxsize=RPC_POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def _json_loads(raw):
+    """Decodes JSON bytes/str with orjson when installed, falling back to the stdlib."""
+    if orjson:
+        try: return orjson.loads(raw)
+        except orjson.JSONDecodeError: pass # e.g. integers beyond 64 bits; let the stdlib handle it
+    return json.loads(raw)
+
+def _json_dumps(obj, indent=False):
+    """Encodes JSON (to str) with orjson when installed, falling back to the stdlib; unknown types become str."""
+    if orjson:
+        try: return orjson.dumps(obj, default=str, option=orjson.OPT_INDENT_2 if indent else 0).decode()
+        except TypeError: pass # e.g. integers beyond 64 bits or non-str dict keys
+    return json.dumps(obj, indent=2 if indent else None, default=str)
+
+class FastJSONHTTPProvider(Web3.HTTPProvider):
+    """HTTPProvider whose JSON-RPC responses (single and batch) are decoded via _json_loads."""
+    @staticmethod
+    def decode_rpc_response(raw_response):
+        return _json_loads(raw_response)
+
+# --- Persistent RPC Response Cache ---
+# Responses tied to a block deep enough behind the head never change, so they are kept on disk
+# across restarts and shared by every Streamlit process on the host.
+RPC_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "rpc_cache.sqlite")
+RPC_CACHE_MIN_CONFIRMATIONS = 64 # Same reorg-safety margin as the historical Parquet cache
+RPC_DISK_CACHE_METHODS = {"eth_getTransactionByHash", "eth_getTransactionReceipt", "eth_getBlockByNumber", "debug_traceBlockByNumber"}
+# Batched header waves (timestamps, bloom pre-check) span whole scan ranges; their timestamps have their own table
+RPC_DISK_CACHE_BATCH_METHODS = RPC_DISK_CACHE_METHODS - {"eth_getBlockByNumber"}
+
+class DiskCachedHTTPProvider(FastJSONHTTPProvider):
+    """FastJSONHTTPProvider that persists finalized single-call responses in sqlite, keyed by (method, params).
+    Finality is judged against the head seen in eth_blockNumber responses; nothing is cached until one is seen."""
+    def __init__(self, *args, cache_path=RPC_CACHE_PATH, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cache_path = cache_path
+        self._cache_db = None
+        self._cache_lock = threading.Lock()
+        self._head_block = None
+
+    def _cache_conn(self):
+        """Opens the sqlite store on first use (callers hold _cache_lock)."""
+        if self._cache_db is None:
+            os.makedirs(os.path.dirname(self._cache_path), exist_ok=True)
+            self._cache_db = sqlite3.connect(self._cache_path, check_same_thread=False)
+            self._cache_db.execute("CREATE TABLE IF NOT EXISTS rpc_responses (key TEXT PRIMARY KEY, response TEXT NOT NULL)")
+            self._cache_db.execute("CREATE TABLE IF NOT EXISTS block_timestamps (block INTEGER PRIMARY KEY, timestamp INTEGER NOT NULL)")
+        return self._cache_db
+
+    def _response_block(self, method, params, result):
+        """Block number a response belongs to, or None when unknown (pending tx, 'latest', missing result)."""
+        if isinstance(result, dict) and (result.get("blockNumber") or result.get("number")):
+            return int(result.get("blockNumber") or result.get("number"), 16)
+        if method.endswith("ByNumber") and params and isinstance(params[0], str) and params[0].startswith("0x"):
+            return int(params[0], 16)
+        return None
+
+    def _read_cached(self, method, key):
+        """Persisted response for a cache key, or None on a miss/read error."""
+        try:
+            with self._cache_lock:
+                row = self._cache_conn().execute("SELECT response FROM rpc_responses WHERE key = ?", (key,)).fetchone()
+            if row: return _json_loads(row[0])
+        except sqlite3.Error as e:
+            print(f"Warn: RPC disk cache read failed for {method}: {e}")
+        return None
+
+    def _observe_response(self, method, params, key, response):
+        """Tracks the head from eth_blockNumber and persists finalized responses of cacheable methods."""
+        if method == "eth_blockNumber" and isinstance(response.get("result"), str):
+            self._head_block = int(response["result"], 16)
+        if key is None or "error" in response or response.get("result") is None: return
+        block_number = self._response_block(method, params, response["result"])
+        if block_number is not None and self._head_block is not None and block_number <= self._head_block - RPC_CACHE_MIN_CONFIRMATIONS:
+            try:
+                with self._cache_lock:
+                    db = self._cache_conn()
+                    db.execute("INSERT OR REPLACE INTO rpc_responses (key, response) VALUES (?, ?)", (key, _json_dumps(response)))
+                    db.commit()
+            except sqlite3.Error as e:
+                print(f"Warn: RPC disk cache write failed for {method}: {e}")
+
+    @staticmethod
+    def _cache_key(method, params, methods=RPC_DISK_CACHE_METHODS):
+        return f"{method}:{Web3.to_json(list(params))}" if method in methods else None
+
+    def make_request(self, method, params):
+        key = self._cache_key(method, params)
+        cached = self._read_cached(method, key) if key else None
+        if cached: return cached
+        response = super().make_request(method, params)
+        self._observe_response(method, params, key, response)
+        return response
+
+    def make_batch_request(self, batch_requests):
+        """Serves cacheable entries from disk and sends only the rest as a batch, so batched lookups
+        (e.g. tx + receipt in get_tx_details) share the same persistent cache as single calls."""
+        keys = [self._cache_key(method, params, RPC_DISK_CACHE_BATCH_METHODS) for method, params in batch_requests]
+        responses = [self._read_cached(method, key) if key else None for (method, _), key in zip(batch_requests, keys)]
+        pending = [i for i, response in enumerate(responses) if response is None]
+        if not pending: return responses
+        fresh = super().make_batch_request([batch_requests[i] for i in pending]) # Returned in request order
+        if not isinstance(fresh, list): return fresh # Batch-level error object (e.g. batches unsupported)
+        for i, response in zip(pending, fresh):
+            method, params = batch_requests[i]
+            self._observe_response(method, params, keys[i], response)
+            responses[i] = response
+        return responses
+
+    def load_block_timestamps(self, block_nums):
+        """{block number: unix timestamp} for the given blocks that were persisted earlier."""
+        found = {}
+        try:
+            with self._cache_lock:
+                db = self._cache_conn()
+                for i in range(0, len(block_nums), 500): # Stay under SQLite's bound-parameter limit
+                    chunk = [int(block_num) for block_num in block_nums[i:i + 500]]
+                    found.update(db.execute(f"SELECT block, timestamp FROM block_timestamps WHERE block IN ({','.join('?' * len(chunk))})", chunk).fetchall())
+        except sqlite3.Error as e:
+            print(f"Warn: Block timestamp cache read failed: {e}")
+        return found
+
+    def save_block_timestamps(self, timestamps):
+        """Persists {block number: unix timestamp}, keeping only blocks past the reorg margin."""
+        if self._head_block is None: return
+        final = [(int(block_num), int(ts)) for block_num, ts in timestamps.items() if block_num <= self._head_block - RPC_CACHE_MIN_CONFIRMATIONS]
+        if not final: return
+        try:
+            with self._cache_lock:
+                db = self._cache_conn()
+                db.executemany("INSERT OR REPLACE INTO block_timestamps (block, timestamp) VALUES (?, ?)", final)
+                db.commit()
+        except sqlite3.Error as e:
+            print(f"Warn: Block timestamp cache write failed: {e}")
+
+    def clear_disk_cache(self):
+        """Drops every persisted response and block timestamp. Returns how many entries were removed."""
+        try:
+            with self._cache_lock:
+                db = self._cache_conn()
+                removed = db.execute("DELETE FROM rpc_responses").rowcount
+                removed += db.execute("DELETE FROM block_timestamps").rowcount
+                db.commit()
+            return removed
+        except sqlite3.Error as e:
+            print(f"Warn: Could not clear RPC disk cache: {e}")
+            return 0
+
 @st.cache_resource
 def get_web3_connection(rpc_endpoint):
     if not rpc_endpoint: return None
     print(f"Attempting connection via RPC: {rpc_endpoint[:30]}...")
     try:
         request_kwargs = {'timeout': 120} # Increased timeout for potentially longer calls like historical batching
-        provider = Web3.HTTPProvider(rpc_endpoint, request_kwargs=request_kwargs)
+        provider = DiskCachedHTTPProvider(rpc_endpoint, request_kwargs=request_kwargs, session=_make_rpc_session()) # Pooled keep-alive session
         w3_instance = Web3(provider)
         if w3_instance.is_connected():
             print(f"✅ Successfully connected via Google Cloud Blockchain RPC: {rpc_endpoint[:30]}...")
@@ -152,480 +362,24 @@ def get_web3_connection(rpc_endpoint):
         st.error(f"❌ Error connecting/checking GCP RPC: {e_connect}", icon="🔥")
         return None
 
+@st.cache_resource
+def get_pyusd_contract(_w3, contract_address):
+    """Builds the PYUSD contract object once per connection/address (ABI parsing is not repeated on reruns)."""
+    return _w3.eth.contract(address=contract_address, abi=PYUSD_ABI_EXPANDED)
+
 w3 = get_web3_connection(GCP_RPC_ENDPOINT)
 
 # --- Apply Custom CSS ---
-# >> CSS includes the new .scrollable-tab-content class <<
-st.markdown(
-    """
-<style>
-    /* --- Global Font Imports --- */
-     @import url('https://fonts.googleapis.com/css2?family=Orbitron:wght@400;700&display=swap');
-    @import url('https://fonts.googleapis.com/css2?family=Roboto:wght@300;400;700&display=swap');
-    @import url('https://fonts.googleapis.com/css2?family=Inconsolata:wght@300;400;700&display=swap'); /* Cyberpunk font */
-
-   /* --- Base Body & App Styling --- */
-   body {
-        font-family: 'Orbitron', sans-serif;
-        color: #99ffcc; /* Quantum Mint Green for text */
-        background-color: #000000;
-        cursor: url('data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAACAAAAAgCAYAAABzenr0AAAACXBIWXMAAAsTAAALEwEAmpwYAAAF7WlUWHRYTUw6Y29tLmFkb2JlLnhtcAAAAAAAPD94cGFja2V0IGJlZ2luPSLvu78iIGlkPSJXNU0wTXBDZWhpSHpyZVN6TlRjemtjOWQiPz4gPHg6eG1wbWV0YSB4bWxuczpxPSJhZG9iZTpuczptZXRhLyIgeDp4cXB0az0iQWRvYmUgWE1QIENvcmUgNS42LWMxNDUgNzkuMTYzNDk5LCAyMDE4LzA4LzEzLTE2OjQwOjIyICAgICAgICAiPiA8cmRmOlJERiB4bWxuczpyZGY9Imh0dHA6Ly93d3cudzMub3JnLzE5OTkvMDcvMjItcmRmLXN5bnRheC-ucyMiPiA8cmRmOkRlc2NyaXB0aW9uIHJkZjphYb3J1dD0iIiB4bWxuczpxbXA9Imh0dHA6Ly9ucy5hZG9iZS5jb20veGFwLzEuMC8iIHhtbG5zOmRjPSJodHRwOi8vcHVybC5vcmcvZGMvZWxlbWVudHMvMS4xLyIgeG1eNz0iaHR0cDovL25zLmFkb2JlLmNvbS9waG90b3NvcC8xLjAvIiB4bWxuczp4XGPMT0iaHR0cDovL25zLmFkb2JlLnBvbS94YXAvMS4wL21tLyIgeG1eZTpzdEV2dD0iaHR0cDovL25zLmFkb2JlLmNvbS94YXAvMS4wL3NUeXBlL1Jlc291cmNlRXZlbnQjIiB4bXA6Q3JlYXRvclRvb2w9IkFkb2JlIFBob3Rvc2hvcCBDQyAyMDE5IChXaW5kb3dzKSIgeG1wOkNyZWF0ZURhdGU9IjIwMjMtMDYtMjJUMTU6NTE6MTgrMDI6MDAiIHhtcDpNb2RpZnlEYXRlPSIyMDIzLTA2LTIyVDE1OjUzOjA4KzAyOjAwIiB4bXA6TWV0YWRhdGFEYXRlPSIyMDIzLTA2LTIyVDE1OjUzOjA4KzAyOjAwIiBkYzpmb3JtYXQ9ImltYWdlL3BuZyIgcGhvdG9zaG9wOkNvbG9yTW9kZT0iMyIgcGhvdG9zaG9wOklDUFByb2ZpbGU9InNSR0IgSUVDNjE5NjYtMi4xIiB4bXBNTTpJbnN0YW5jZUlEPSJ4bXAuaWlkOmY3NDQ0OGZkLWE3MzUtY2Q0Zi05NjdiLWI2M2M5NWU3NjdjMCIsIHhtwE5NOkRvY3VtZW50SUQ9ImFkb2JlOmRvY2lkOnBob3Rvc2hvcDphOTEzZTkyNy1kODM3LWVmNDctYjdhMC02MjRjNzA1NzUyZTAiIHhtcE1NOk9yaWdpbmFsRG9jdW1lbnRJRD0ieG1wLmRpZDo3YzUzODExNi1iZDFjLTMwNGItODMyNy0wMjg5MzA0MjA3ZGMiPiA8eG1wTU06SGlzdG9yeT4gPHJkZjpTZXE+IDxyZGY6bGkgc3RFdnQ6YWN0aW9uPSJjcmVhdGVkIiBzdEV2dDppbnN0YW5jZUlEPSJ4bXAuaWlkOjdjNTM4MTIxNi1iZDFjLTMwNGItODMyNy0wMjg5MzA0MjA3ZGMiIHN0EvnQudoZW59IjIyMy0wNi0yMlQxNTo1MToxOCswMjowMCIgc3RFdnQ6c29mdHdhcmVBZ2VudD0iAWRvYmUgUGhvdG9zaG9wIENDIDIwMTkgKFdpbmRvd3MpIi8+IDxyZGY6bGkgc3RFdnQ6YWN0aW9uPSJzYXZlZCIgc3RFdnQ6aW5zdGFuY2VJRD0ieG1wLmlpZDpmNzQ0NDhmZC1hNzM1LWNkNGYtOTY3Yi1iNjNjOTVlNzY3YzAiIHN0RXZ0OndoZW59IjIyMy0wNi0yMlQxNTo1MzowOCswMjowMCIgc3RFdnQ6c29mdHdhcmVBZ2VudD0iAWRvYmUgUGhvdG9zaG9wIENDIDIwMTkgKFdpbmRvd3MpIiBzdEV2dDpjaGFuZ2VkPSIvIi8+IDwvcmRmOlNlcT4gPC94bXBNTTpIaXN0b3J5PiA8L3JkZjpEZXNjcmlwdGlvbj4gPC9yZGY6UkRGPjwvOnhtcG1ldGE+IDw/eHBhY2tldCBlbmQ9InIiPz7PB4oMAAACOUlEQVRYhe2XPWgUURSFv7lrl0AWJAYRROMPiBFsFNRCjKKdWImFWNlZKyKColUQsTUgWFpaKIJYiYUoQkQMKBgRVEKIoBLBnyIs2WyOxcyG2cnMzs4k2cLE0+y8N3Pvu+fNvfPeWElVuJLBOEvJzDpmds7MnGv3+TUze+5/+9s5d8aS5uG4mdmFRAJmNmlmxxK4b5jZqJldNbO+XMNKTw9r5+d5BEwsnxJWAsPAD2AXsBMYAxYz5gEGgVHgNLAWOAocAt4DvcAH4F6UZLrXwOMiw0sF0Av0AW3gBvAkEh8CrnjxRuCIlxNYBbQC8TDQAZaBd8Ai0PEJ54BPqcdLA/gD/PROzNtRwDPfbuA9cBR4DXwEvvoA7gPPgLfADHABOJTSfzNZ+LLZrr5+7TbduuV6slVmNuCcm41OO+6D+OJxfAS2AJsKglIWu4BNwPZkUHW/UrHevj7Vamk5VuWYmVkryTBVHaqK6n+U5wIUazdwz8w2F4inYMWKOVHaQBr9wDrgaNT/2hsCj9z8TpKRkqGqDhQYUEkH1Zcq6kNEotuqU6pNv4cO5AmobkHVpbRXYkRVG6qTqrOqj1SvqI6pTqs+9fF+1YZvtwrGOun7TvrxVzmuVHU9I4AV1T09fVX16BoYQHVviYAfQhAJQ9WJ3aodxcf6yPBKZNkwMZZuVHVQte0zWPVCYYMJTqk2VWt+rYbqjRUG8BvMuuqE6vdCAdSAb8AOoAN8BoYIWTILMz4BLgN/gQHC+Z7nP9RDDRWeMlXHAAAAAElFTkSuQmCC'), auto;
-    }
-
-    .stApp {
-        /* background-image: url('https://www.transparenttextures.com/patterns/hexellence.png'); */ /* Subtle Hex Pattern */
-        background-color: rgba(0, 5, 10, 0.9); /* Dark blue-black overlay */
-         background: linear-gradient(rgba(0, 0, 0, 0.6), rgba(0, 0, 0, 0.9)),
-                    url('https://i.imgur.com/530DGSL.png'); /* Keep the cyberpunk background with overlay */
-        background-size: cover;
-        background-position: center;
-        background-attachment: fixed;
-    }
-
-    /* --- Title Styles --- */
-    .title { /* Main Dashboard Title */
-        font-size: 55px; /* Adjusted slightly */
-        font-family: 'Orbitron', sans-serif;
-        color: #00ffff; /* Cyan title color */
-        text-align: center;
-        text-shadow: 0 0 15px #00ffff, 0 0 30px #00ffff, 0 0 45px #00ffff, 0 0 60px #00ffff; /* Intense glow */
-        animation: flicker 1.8s infinite alternate, glitch 1.2s infinite alternate; /* Slower, alternating animations */
-        margin-bottom: 15px; /* Reduced space below title */
-    }
-    .gcp-subtitle { /* Subtitle specific to v1.8 */
-        font-size: 18px;
-        font-family: 'Roboto', sans-serif;
-        color: #99ffcc;
-        text-align: center;
-        text-shadow: 0 0 5px #99ffcc;
-        margin-bottom: 25px;
-        opacity: 0.9;
-     }
-     .cyber-matrix-title { /* Used in sidebar and potentially elsewhere */
-        font-family: 'Orbitron', sans-serif;
-        font-size: 26px; /* Adjusted size */
-        color: #ccff00; /* Neon lime */
-        text-shadow: 0 0 10px #ccff00, 0 0 20px #ccff00;
-        animation: flicker-fast 1.2s infinite alternate, glitch-slow 2.5s infinite alternate;
-        margin-bottom: 10px;
-    }
-    .ai-assistant-title { /* Used for the Gemini chat title in sidebar */
-        font-family: 'Orbitron', sans-serif;
-        font-size: 1.4em;
-        color: #ff9933; /* Quantum Orange */
-        text-shadow: 0 0 6px #ff9933;
-        margin-top: 20px;
-        margin-bottom: 10px;
-    }
-
-    /* --- Animations --- */
-    @keyframes flicker {
-        0%, 100% { opacity: 1; }
-        50% { opacity: 0.7; }
-    }
-    @keyframes flicker-fast {
-        0%, 100% { opacity: 0.9; }
-        50% { opacity: 0.5; }
-    }
-    @keyframes glitch {
-        0% { transform: skewX(0deg); text-shadow: 0 0 10px #00ffff, 0 0 20px #00ffff; }
-        25% { transform: skewX(1deg); text-shadow: -2px 0 #99ffcc, 2px 2px #00ffff; }
-        50% { transform: skewX(-1deg); text-shadow: 2px -2px #99ffcc, -2px 2px #00ffff; }
-        75% { transform: skewX(0.5deg); text-shadow: -1px -1px #99ffcc, 1px -1px #00ffff; }
-        100% { transform: skewX(0deg); text-shadow: 0 0 10px #00ffff, 0 0 20px #00ffff; }
-    }
-    @keyframes glitch-slow {
-       0%, 100% { transform: skewX(0deg); text-shadow: 0 0 5px #ccff00, 0 0 10px #ccff00; }
-        33% { transform: skewX(-0.5deg); text-shadow: -1px 0 #99ffcc, 1px 1px #ccff00; }
-        66% { transform: skewX(0.5deg); text-shadow: 1px -1px #99ffcc, -1px 1px #ccff00; }
-    }
-
-    /* --- General Element Styling --- */
-    .stButton>button {
-        font-family: 'Orbitron', sans-serif;
-        color: #000000; /* Black text */
-        background-color: #99ffcc; /* Quantum Mint Green background */
-        border: 1px solid #00ffcc; /* Slightly darker border */
-        box-shadow: 0 0 10px #99ffcc;
-        transition: all 0.25s ease-out;
-        padding: 8px 18px; /* Adjust padding */
-        border-radius: 5px; /* Rounded corners */
-        font-weight: bold;
-    }
-    .stButton>button:hover {
-        background-color: #00ffff; /* Cyan hover background */
-        color: #000000;
-        box-shadow: 0 0 20px #00ffff, 0 0 40px #00ffff;
-        transform: translateY(-2px); /* Lift effect */
-    }
-     .stButton>button:active {
-        transform: translateY(0px); /* Press effect */
-        box-shadow: 0 0 5px #00ffff;
-     }
-     /* Added Disabled Style */
-      .stButton>button:disabled {
-        background-color: rgba(100, 100, 100, 0.5);
-        color: rgba(0, 0, 0, 0.7);
-        border-color: rgba(150, 150, 150, 0.6);
-        box-shadow: none;
-        cursor: not-allowed;
-     }
-      .stButton>button:disabled:hover {
-        background-color: rgba(100, 100, 100, 0.5); /* Prevent hover effects when disabled */
-        color: rgba(0, 0, 0, 0.7);
-        box-shadow: none;
-        transform: none;
-      }
-
-    h1, h2, h3, h4, h5, h6 {
-        font-family: 'Orbitron', sans-serif;
-        color: #ff9933; /* Quantum Orange */
-        text-shadow: 0 0 6px #ff9933;
-    }
-    /* Adjusted Header Sizes slightly */
-    h1 { font-size: 2.4em; } /* Main headers */
-    h2 { font-size: 1.7em; } /* Sub-headers */
-    h3 { font-size: 1.3em; } /* Section headers */
-
-    /* General text elements */
-    p, div, textarea, input, select, span, li, a, label {
-        color: #b3ffe6; /* Lighter mint green for readability */
-        font-family: 'Roboto', sans-serif; /* Roboto for general text */
-        font-size: 1.05em; /* Slightly larger base font */
-    }
-    /* Optional: Specific style for tab descriptions if needed */
-    .tab-description {
-       font-size: 0.95em;
-       color: #99ccff; /* Light blue for description */
-       margin-bottom: 15px;
-       opacity: 0.9;
-    }
-
-    /* Input Fields */
-    .stTextInput>div>div>input,
-    .stTextArea>div>div>textarea,
-    .stNumberInput>div>div>input {
-        color: #99ffcc;
-        background-color: rgba(0, 30, 20, 0.8); /* Darker, slightly green background */
-        border: 1px solid #99ffcc;
-        box-shadow: inset 0 0 8px rgba(153, 255, 204, 0.5); /* Softer inset glow */
-        font-family: 'Inconsolata', monospace; /* Monospace for inputs */
-        border-radius: 4px;
-        padding: 10px;
-    }
-    .stTextInput>div>div>input:focus,
-    .stTextArea>div>div>textarea:focus,
-    .stNumberInput>div>div>input:focus {
-        box-shadow: inset 0 0 10px #99ffcc, 0 0 10px #99ffcc;
-        border-color: #ffffff; /* White border on focus */
-    }
-
-    /* Selectbox styling */
-     .stSelectbox>div>div>div {
-        color: #99ffcc;
-        background-color: rgba(0, 30, 20, 0.8);
-        border: 1px solid #99ffcc;
-        border-radius: 4px;
-        font-family: 'Roboto', sans-serif;
-     }
-
-    /* Ensure Dataframes have dark background */
-    .stDataFrame {
-        background-color: rgba(0, 0, 0, 0.5);
-        border: 1px solid #99ffcc;
-    }
-    .stDataFrame thead th {
-        background-color: #003322; /* Dark green header */
-        color: #ccff00; /* Neon lime header text */
-        font-family: 'Orbitron', sans-serif;
-    }
-    .stDataFrame tbody tr td {
-        color: #b3ffe6; /* Lighter mint text for data */
-        font-family: 'Inconsolata', monospace;
-        border-color: #336655; /* Darker grid lines */
-    }
-    /* Optional: Hover effect for dataframe rows */
-    .stDataFrame tbody tr:hover {
-       background-color: rgba(0, 50, 40, 0.7) !important; /* Highlight row on hover */
-    }
-
-    /* --- >>> SIDEBAR STYLES (Restored from v1.3) <<< --- */
-    .stSidebar {
-        background-color: rgba(0, 10, 5, 0.95); /* Very dark, slightly green sidebar */
-        border-right: 2px solid #ccff00; /* Neon lime border */
-        padding-top: 20px;
-    }
-    .stSidebar .stMarkdown h2, .stSidebar .stMarkdown h3 { /* Target markdown headers in sidebar */
-        color: #ff9933; /* Quantum Orange headers */
-        text-shadow: 0 0 5px #ff9933;
-        /* This will NOT affect .ai-assistant-title unless it's also an h2/h3 */
-    }
-    .stSidebar .stSelectbox>div>div>div, .stSidebar .stRadio>div>label { /* Sidebar controls */
-        color: #00ffff; /* Cyan text */
-        font-family: 'Roboto', sans-serif;
-    }
-    .stSidebar .cyber-matrix-title { /* Sidebar title */
-        margin-bottom: 20px; /* More space below title */
-        /* Inherits base .cyber-matrix-title styles */
-    }
-    .stSidebar .stMetric { /* Style metrics in sidebar */
-        background-color: rgba(0, 51, 34, 0.7); /* Dark green metric background */
-        border-radius: 5px;
-        padding: 10px;
-        margin-bottom: 10px;
-        border: 1px solid #009966;
-    }
-    .stSidebar .stMetric label { /* Metric label */
-        color: #ff9933; /* Quantum Orange label */
-        font-family: 'Orbitron', sans-serif;
-        font-size: 0.9em;
-    }
-    /* Keep v1.8 specific metric styling if needed */
-     .stSidebar .stMetric label[for*="rpc-status"] { /* Style GCP RPC status label slightly */
-        font-weight: bold; /* Example */
-     }
-    .stSidebar .stMetric .stMetricValue { /* Metric value */
-         color: #99ffcc; /* Quantum Mint value */
-         font-size: 1.3em;
-         font-family: 'Inconsolata', monospace;
-    }
-    .stSidebar p, .stSidebar li, .stSidebar a { /* General sidebar text (excluding chat) */
-        color: #b3ffe6;
-        font-family: 'Roboto', sans-serif;
-    }
-    .stSidebar .stExpander { /* Style expanders */
-         border: 1px solid #009966;
-         border-radius: 4px;
-         background-color: rgba(0, 30, 20, 0.8);
-         margin-bottom: 10px;
-    }
-     .stSidebar .stExpander header { /* Expander header */
-         color: #ff9933; /* Quantum Orange header */
-         font-family: 'Orbitron', sans-serif;
-     }
-     .stSidebar .stExpander a { /* Base link style in expanders */
-         color: #00ffff !important;
-         text-decoration: none; /* Or underline if preferred */
-         transition: color 0.2s ease;
-     }
-     .stSidebar .stExpander a:hover {
-         color: #ffffff !important;
-         text-decoration: underline;
-     }
-     /* Keep v1.8 specific link styles */
-     .stSidebar .stExpander a[href*="cloud.google.com/web3"] {
-        font-weight: bold;
-        color: #99ffcc !important; /* Override base link color */
-     }
-     .stSidebar .stExpander a[href*="cloud.google.com/web3"]:hover {
-        color: #ffffff !important;
-     }
-     .stSidebar .stExpander a[href*="newsapi.org"] {
-        font-weight: bold;
-        color: #99ccff !important; /* Light blue for NewsAPI link */
-    }
-    .stSidebar .stExpander a[href*="newsapi.org"]:hover {
-        color: #ffffff !important;
-    }
-    /* --- >>> END OF RESTORED SIDEBAR STYLES <<< --- */
-
-
-     /* --- Chat Specific Styles (Kept from v1.8) --- */
-    [data-testid="chatAvatarIcon-user"] svg { fill: #00ffff; }
-    [data-testid="chatAvatarIcon-assistant"] svg { fill: #ccff00; }
-
-    /* ENLARGE CHATBOX CHANGE: Adjustments to chat messages */
-    .stChatMessage {
-        background-color: rgba(0, 20, 15, 0.85); /* Slightly more opaque */
-        border: 1px solid rgba(153, 255, 204, 0.5); /* Slightly stronger border */
-        border-radius: 8px;
-        margin-bottom: 18px; /* Increased spacing */
-        padding: 12px 18px; /* Increased padding */
-    }
-     .stChatMessage p, .stChatMessage li { /* Increase message font size */
-        color: #e6fff2;
-        font-family: 'Roboto', sans-serif;
-        font-size: 1.05em; /* Increased font size */
-        line-height: 1.6; /* Improved readability */
-     }
-      .stChatMessage code { /* Inline code styling */
-        background-color: rgba(0, 0, 0, 0.5);
-        color: #ff9933;
-        font-family: 'Inconsolata', monospace;
-        padding: 2px 5px;
-        border-radius: 3px;
-        border: 1px solid #336655;
-        font-size: 0.95em; /* Slightly larger inline code */
-     }
-     /* Style ``` code blocks within chat */
-     .stChatMessage pre > code {
-        background-color: rgba(0, 0, 0, 0.75) !important;
-        color: #aaffdd !important; /* Adjusted code block text */
-        font-family: 'Inconsolata', monospace !important;
-        padding: 12px; /* Increased padding */
-        border-radius: 5px;
-        border: 1px solid #99ccff;
-        display: block;
-        overflow-x: auto;
-        font-size: 1.0em !important; /* Larger code block font */
-     }
-     .stChatMessage a { color: #00ffff !important; text-decoration: underline; }
-     .stChatMessage a:hover { color: #ffffff !important; }
-
-
-    /* ENLARGE CHATBOX CHANGE: Target chat input specifically */
-    .stChatInput textarea {
-        font-family: 'Inconsolata', monospace !important;
-        color: #ccff00 !important;
-        background-color: rgba(0, 40, 30, 0.9) !important;
-        border: 1px solid #00ffff !important;
-        box-shadow: inset 0 0 8px rgba(0, 255, 255, 0.6);
-        min-height: 80px !important; /* Increased minimum height */
-        height: 120px !important; /* Increased default height */
-        font-size: 1.1em !important; /* Larger font in input */
-        padding: 12px !important; /* Adjust padding */
-        line-height: 1.5 !important;
-    }
-     .stChatInput textarea:focus {
-        box-shadow: inset 0 0 12px #00ffff, 0 0 12px #00ffff;
-     }
-     /* Container for chat input */
-     div[data-testid="stChatInput"] {
-        /* Add styles here if needed, e.g., background */
-        background-color: rgba(0, 10, 5, 0.8); /* Match sidebar base? */
-        padding-top: 10px; /* Add some space above */
-     }
-
-    /* --- Code Blocks (General) --- */
-    .stCodeBlock {
-        border: 1px solid #99ffcc;
-        box-shadow: 0 0 10px rgba(153, 255, 204, 0.3);
-        background-color: rgba(0, 0, 0, 0.85) !important; /* Ensure dark background */
-    }
-     .stCodeBlock code {
-          color: #99ffcc; /* Quantum Mint text */
-          font-family: 'Inconsolata', monospace !important; /* Monospace font */
-          font-size: 1em !important;
-     }
-
-    /* --- News Feed Styling (Kept from v1.8) --- */
-     .news-item {
-        border: 1px dashed rgba(153, 255, 204, 0.4); /* Mint dashed border */
-        padding: 15px;
-        margin-bottom: 20px;
-        border-radius: 5px;
-        background-color: rgba(0, 20, 15, 0.6); /* Dark background */
-     }
-     .news-item h3 {
-        font-size: 1.2em; /* Slightly smaller news titles */
-        color: #ccff00; /* Neon lime for titles */
-        margin-bottom: 5px;
-        text-shadow: 0 0 5px #ccff00;
-     }
-     .news-item h3 a {
-         color: #ccff00 !important; /* Ensure link matches title color */
-         text-decoration: none;
-         transition: color 0.2s ease;
-     }
-     .news-item h3 a:hover {
-         color: #ffffff !important; /* White hover */
-         text-decoration: underline;
-     }
-     .news-item p { /* News snippet */
-         font-size: 0.95em;
-         color: #b3ffe6; /* Lighter mint */
-         margin-bottom: 8px;
-         line-height: 1.5;
-     }
-     .news-item .news-date { /* News date */
-         font-size: 0.85em;
-         color: #99ccff; /* Light blue for date */
-         font-family: 'Inconsolata', monospace;
-         text-align: right;
-         opacity: 0.8;
-     }
-
-
-    /* --- Dividers --- */
-    hr {
-        border-top: 1px dashed #99ffcc; /* Dashed mint divider */
-        opacity: 0.5;
-    }
+# >> CSS (incl. the .scrollable-tab-content class) lives in assets/cyber.css <<
+CSS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "cyber.css")
 
-    /* --- Alerts (Info/Success/Error/Warning) --- */
-     div[data-testid="stAlert"] {
-        font-family: 'Roboto', sans-serif;
-        border-radius: 5px;
-        border-width: 2px;
-        opacity: 0.95;
-     }
-     div[data-testid="stAlert"] > div[role="alert"] { /* Target inner alert box */
-        display: flex;
-        align-items: center;
-     }
-    /* Success */
-    div[data-baseweb="alert"][role="alert"].st-ae { /* Selector might change between versions */
-        background-color: rgba(0, 80, 40, 0.8); /* Darker green success */
-        border-color: #00ff88;
-        color: #ccffcc; /* Lighter green text */
-    }
-    /* Info */
-    div[data-baseweb="alert"][role="alert"].st-b7 { /* Selector might change */
-        background-color: rgba(0, 50, 80, 0.8); /* Darker blue info */
-        border-color: #00aaff;
-        color: #cceeff; /* Lighter blue text */
-    }
-    /* Error */
-    div[data-baseweb="alert"][role="alert"].st-b6 { /* Selector might change */
-        background-color: rgba(100, 0, 20, 0.8); /* Darker red error */
-        border-color: #ff4466;
-        color: #ffcccc; /* Lighter red text */
-    }
-     /* Warning */
-    div[data-baseweb="alert"][role="alert"].st-b5 { /* Selector might change */
-        background-color: rgba(100, 80, 0, 0.8); /* Darker yellow warning */
-        border-color: #ffcc00;
-        color: #ffffcc; /* Lighter yellow text */
-    }
-
-    /* --- Plotly Chart Backgrounds --- */
-    .plotly-graph-div {
-        background: transparent !important;
-    }
-    .plot-container .plotly svg {
-        background: transparent !important;
-    }
+@st.cache_resource
+def load_css(path):
+    """Reads the dashboard stylesheet once per process."""
+    with open(path, encoding="utf-8") as css_file:
+        return css_file.read()
 
-    /* --- >>> NEW: Scrollable Tab Content <<< --- */
-    .scrollable-tab-content {
-        max-height: 75vh; /* Adjust height as needed (e.g., 70vh, 600px) */
-        overflow-y: auto; /* Add vertical scrollbar when content overflows */
-        overflow-x: hidden; /* Prevent horizontal scrollbar unless content forces it */
-        padding-right: 15px; /* Add space for the scrollbar to avoid overlapping content */
-        padding-bottom: 20px; /* Optional: Add some space at the bottom */
-    }
-    /* Optional: Style the scrollbar for webkit browsers (Chrome, Safari) */
-    .scrollable-tab-content::-webkit-scrollbar {
-        width: 8px; /* Width of the scrollbar */
-    }
-    .scrollable-tab-content::-webkit-scrollbar-track {
-        background: rgba(0, 30, 20, 0.5); /* Track color */
-        border-radius: 4px;
-    }
-    .scrollable-tab-content::-webkit-scrollbar-thumb {
-        background-color: #00ffff; /* Scrollbar handle color (cyan) */
-        border-radius: 4px;
-        border: 1px solid #99ffcc; /* Border for the handle */
-    }
-    .scrollable-tab-content::-webkit-scrollbar-thumb:hover {
-        background-color: #ccff00; /* Handle color on hover (lime) */
-    }
-    /* --- >>> END SCROLLABLE TAB CSS <<< --- */
-
-</style>
-    """,
-    unsafe_allow_html=True,
-)
+st.markdown(f"<style>\n{load_css(CSS_PATH)}</style>", unsafe_allow_html=True)
 
 # --- Global Variables ---
 pyusd_contract = None
@@ -638,8 +392,8 @@ contract_ok = False
 
 if rpc_ok:
     try:
-        PYUSD_CONTRACT_ADDRESS = Web3.to_checksum_address(PYUSD_CONTRACT_ADDRESS_NON_CHECKSUM)
-        pyusd_contract = w3.eth.contract(address=PYUSD_CONTRACT_ADDRESS, abi=PYUSD_ABI_EXPANDED)
+        PYUSD_CONTRACT_ADDRESS = to_checksum(PYUSD_CONTRACT_ADDRESS_NON_CHECKSUM)
+        pyusd_contract = get_pyusd_contract(w3, PYUSD_CONTRACT_ADDRESS) # Cached across reruns
         contract_ok = True
         print(f"✅ PYUSD contract initialized via GCP RPC: {PYUSD_CONTRACT_ADDRESS}")
     except Exception as e_contract:
@@ -650,31 +404,78 @@ if rpc_ok:
 # --- Helper Functions ---
 
 # --- Feature 6 Helper ---
+@lru_cache(maxsize=ADDRESS_CACHE_SIZE) # Labels are pure functions of the address; tagging runs per distinct address
 def get_address_label(address):
     """Returns a label for a known address, or a shortened version."""
     try: # Add try-except for robustness if address is invalid
-      checksum_addr = Web3.to_checksum_address(address)
-      label = KNOWN_ADDRESSES.get(checksum_addr)
-      if label:
-          return f"{label} ({checksum_addr[:6]}...{checksum_addr[-4:]})"
-      else:
-          return f"{checksum_addr[:6]}...{checksum_addr[-4:]}"
+      return _format_address_label(to_checksum(address))
     except ValueError:
       return f"Invalid Addr: {str(address)[:10]}..." # Return something if address is bad
 
+def _format_address_label(checksum_addr):
+    """get_address_label for an address that is already checksummed (skips the keccak)."""
+    label = KNOWN_ADDRESSES.get(checksum_addr)
+    if label:
+        return f"{label} ({checksum_addr[:6]}...{checksum_addr[-4:]})"
+    return f"{checksum_addr[:6]}...{checksum_addr[-4:]}"
+
+# --- Multicall3 (fused contract reads) ---
+# Deployed at the same address on mainnet and most EVM chains; aggregate3 runs many view calls in one eth_call
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+MULTICALL3_ABI = [{
+    "inputs": [{"components": [{"name": "target", "type": "address"}, {"name": "allowFailure", "type": "bool"}, {"name": "callData", "type": "bytes"}],
+                "name": "calls", "type": "tuple[]"}],
+    "name": "aggregate3",
+    "outputs": [{"components": [{"name": "success", "type": "bool"}, {"name": "returnData", "type": "bytes"}], "name": "returnData", "type": "tuple[]"}],
+    "stateMutability": "payable", "type": "function",
+}]
+
+@st.cache_resource
+def get_multicall3_contract(_w3):
+    """Builds the Multicall3 contract object once per connection."""
+    return _w3.eth.contract(address=MULTICALL3_ADDRESS, abi=MULTICALL3_ABI)
+
+def multicall3(_w3, calls):
+    """Runs (contract, function name, args) view calls in a single aggregate3 eth_call.
+    Returns the decoded values in order (None for calls that reverted). Raises if Multicall3 itself fails."""
+    payload = [(contract.address, True, contract.encode_abi(fn_name, args=args)) for contract, fn_name, args in calls]
+    results = get_multicall3_contract(_w3).functions.aggregate3(payload).call()
+    values = []
+    for (contract, fn_name, _), (success, return_data) in zip(calls, results):
+        if not success or not return_data: values.append(None); continue
+        output_types = [output['type'] for output in contract.get_function_by_name(fn_name).abi['outputs']]
+        decoded = _w3.codec.decode(output_types, return_data)
+        values.append(decoded[0] if len(decoded) == 1 else decoded)
+    return values
+
 # --- Cached Token Info ---
+@st.cache_resource # Name/symbol/decimals never change for a deployed token: fetch once per process
+def get_token_metadata(_contract, contract_address):
+    """Fetches name, symbol and decimals in one batched JSON-RPC request. Raises on errors (nothing is cached then)."""
+    with _contract.w3.batch_requests() as batch:
+        batch.add(_contract.functions.name())
+        batch.add(_contract.functions.symbol())
+        batch.add(_contract.functions.decimals())
+        name, symbol, decimals = batch.execute()
+    print(f"Token metadata cached for {contract_address}: {name} ({symbol}), {decimals} decimals")
+    return {"name": name, "symbol": symbol, "decimals": decimals}
+
 @st.cache_data(ttl=3600) # Cache for 1 hour
 def get_token_info(_contract): # <-- Added underscore
     """Safely gets token info via the configured GCP RPC endpoint."""
     if not _contract or not w3 or not w3.is_connected(): return None # Note: using global w3 here, which is okay
     # ... rest of function using _contract ...
     try:
-        name = _contract.functions.name().call()
-        symbol = _contract.functions.symbol().call()
-        decimals = _contract.functions.decimals().call()
-        total_supply_raw = _contract.functions.totalSupply().call()
-        total_supply = total_supply_raw / (10**decimals)
-        return {"name": name, "symbol": symbol, "decimals": decimals, "total_supply": total_supply}
+        try: # All four reads in one eth_call
+            name, symbol, decimals, total_supply_raw = multicall3(_contract.w3, [(_contract, fn_name, []) for fn_name in ("name", "symbol", "decimals", "totalSupply")])
+            if None in (name, symbol, decimals, total_supply_raw): raise ValueError("a token read reverted inside Multicall3")
+            metadata = {"name": name, "symbol": symbol, "decimals": decimals}
+        except Exception as multicall_e: # No Multicall3 on this chain/endpoint: batched metadata + a plain totalSupply call
+            print(f"Warn: Multicall3 token info failed ({multicall_e}), falling back to individual calls")
+            metadata = get_token_metadata(_contract, _contract.address) # Immutable part, cached permanently
+            total_supply_raw = _contract.functions.totalSupply().call()
+        total_supply = total_supply_raw / (10**metadata['decimals'])
+        return {**metadata, "total_supply": total_supply}
     except Exception as e:
         if isinstance(e, web3_exceptions.ContractLogicError):
              st.warning(f"⚠️ Token info function error (GCP RPC): {e}. Function might be missing/reverted.", icon="🔢")
@@ -682,14 +483,23 @@ def get_token_info(_contract): # <-- Added underscore
             st.warning(f"⚠️ Token info fetch error (GCP RPC): {e}", icon="🔢")
         return None
 
+@st.cache_data(ttl=60) # Moves with every mint/burn, unlike the rest of token_info (fetched once per session)
+def get_total_supply(_contract, decimals):
+    """Current total supply in tokens via GCP RPC, or None on errors."""
+    try:
+        return _contract.functions.totalSupply().call() / (10**decimals)
+    except Exception as e:
+        print(f"Warn: Total supply fetch failed: {e}")
+        return None
+
 @st.cache_data(ttl=30)
-def get_address_balance(_contract, _address): # <-- Added underscore
+def get_address_balance(_contract, address): # Address stays in the cache key; only the contract is unhashable
     """Safely gets PYUSD balance for an address via the configured GCP RPC endpoint."""
     if not _contract or not w3 or not w3.is_connected(): return None # Using global w3
-    if not Web3.is_address(_address): st.error(f"❌ Invalid Address Format: {_address}"); return None
-    # ... rest of function using _contract and _address ...
+    if not is_valid_address(address): st.error(f"❌ Invalid Address Format: {address}"); return None
+    # ... rest of function using _contract and address ...
     try:
-        cs_addr = Web3.to_checksum_address(_address)
+        cs_addr = to_checksum(address)
         token_data_local = token_info if token_info else get_token_info(_contract) # Fallback fetch needs _contract
         if not token_data_local: st.error("❌ Balance failed: Token info missing (via GCP RPC)."); return None
         decimals = token_data_local['decimals']
@@ -699,6 +509,59 @@ def get_address_balance(_contract, _address): # <-- Added underscore
         st.warning(f"⚠️ Balance fetch error (GCP RPC) for {get_address_label(cs_addr)}: {e}", icon="💰")
         return None
 
+BALANCE_FETCH_WORKERS = 10 # Concurrent balanceOf calls when Multicall3 is unavailable (shares the pooled RPC session)
+
+def _raw_balance_or_none(_contract, address):
+    """balanceOf in raw units, or None on error (safe to run in a worker thread: no Streamlit calls)."""
+    try:
+        return _contract.functions.balanceOf(to_checksum(address)).call()
+    except Exception as e:
+        print(f"Warn: Balance fetch error for {address}: {e}")
+        return None
+
+@st.cache_data(ttl=30, max_entries=32)
+def get_address_balances(_contract, addresses, block_hint=None):
+    """PYUSD balances for several addresses in one Multicall3 eth_call. Returns {address: balance or None}.
+    block_hint (the latest block number, when known) only keys the cache: balances can't change within a block."""
+    if not _contract or not w3 or not w3.is_connected(): return {} # Using global w3
+    token_data_local = token_info if token_info else get_token_info(_contract)
+    if not token_data_local: st.error("❌ Balance failed: Token info missing (via GCP RPC)."); return {}
+    scale = 10**token_data_local['decimals']
+    balances = dict.fromkeys(addresses)
+    valid = [addr for addr in addresses if is_valid_address(addr)]
+    try:
+        raw_balances = multicall3(_contract.w3, [(_contract, "balanceOf", [to_checksum(addr)]) for addr in valid])
+        balances.update({addr: raw / scale if raw is not None else None for addr, raw in zip(valid, raw_balances)})
+    except Exception as multicall_e: # No Multicall3 on this chain/endpoint: one balanceOf call per address, overlapped
+        print(f"Warn: Multicall3 balance read failed ({multicall_e}), falling back to concurrent individual calls")
+        if valid:
+            with ThreadPoolExecutor(max_workers=min(BALANCE_FETCH_WORKERS, len(valid))) as executor:
+                raw_balances = list(executor.map(lambda addr: _raw_balance_or_none(_contract, addr), valid))
+            balances.update({addr: raw / scale if raw is not None else None for addr, raw in zip(valid, raw_balances)})
+    return balances
+
+# --- Cached Block Timestamps ---
+# Mined block timestamps never change, so they are cached far longer than the live feeds
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S UTC'
+
+@lru_cache(maxsize=4096) # Many events share a block, and blocks repeat across reruns
+def format_block_time(block_time):
+    """Display string for a UTC block datetime."""
+    return block_time.strftime(TIMESTAMP_FORMAT)
+
+@st.cache_data(ttl=3600, max_entries=1024)
+def get_block_timestamp(_w3, block_number):
+    """Returns the UTC datetime of a block (None if unavailable). Shares the event scans' timestamp
+    store and on-disk cache, so inspecting a tx from an already scanned block costs no RPC call."""
+    return _get_block_timestamps(_w3, [block_number])[block_number]
+
+@st.cache_resource
+def _block_timestamp_store():
+    """Process-wide {block number: datetime} store shared by the batched event timestamp lookups."""
+    return {}
+
+BLOCK_TIMESTAMP_STORE_MAX = 50000 # Entries kept before the store is reset
+
 # Transaction Details Fetcher (using robust v1.5 version)
 @st.cache_data(ttl=60) # Cache Tx details for 1 minute
 def get_tx_details(_w3, tx_hash):
@@ -710,19 +573,29 @@ def get_tx_details(_w3, tx_hash):
         if not isinstance(tx_hash, str) or not tx_hash.startswith('0x') or len(tx_hash) != 66:
             st.error(f"❌ Invalid Tx Hash Format: `{tx_hash[:15]}...`"); return None
 
-        print(f"Fetching transaction details for: {tx_hash}")
-        # --- FIX: Remove request_kwargs ---
-        tx = _w3.eth.get_transaction(tx_hash)
-        # --- END OF FIX ---
+        print(f"Fetching transaction details and receipt for: {tx_hash}")
+        receipt_future = None
+        try: # Mined tx: tx + receipt in one JSON-RPC batch (a single round trip; finalized ones come from the provider's disk cache)
+            with _w3.batch_requests() as batch:
+                batch.add(_w3.eth.get_transaction(tx_hash))
+                batch.add(_w3.eth.get_transaction_receipt(tx_hash))
+                tx, receipt_batched = batch.execute()
+        except web3_exceptions.TransactionNotFound: # The node answered, but the tx or its receipt is null: one tx lookup tells pending from missing
+            print(f"Batched tx lookup found no receipt for {tx_hash[:10]}..., checking the tx alone")
+            tx, receipt_batched = _w3.eth.get_transaction(tx_hash), None # Raises TransactionNotFound for a missing tx, handled below as before
+        except Exception as batch_e: # No batch support
+            print(f"Batched tx lookup failed ({batch_e.__class__.__name__}), using concurrent single calls")
+            # Receipt lookup is speculative: it runs alongside the tx lookup and is simply dropped if the tx is missing
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                tx_future = executor.submit(_w3.eth.get_transaction, tx_hash)
+                receipt_future = executor.submit(_w3.eth.get_transaction_receipt, tx_hash)
+                tx = tx_future.result()
         if not tx: st.error(f"❌ Tx not found: `{tx_hash[:15]}...`"); return None
         print(f"Transaction found for {tx_hash[:10]}...")
 
         receipt = None
         try:
-            print(f"Fetching transaction receipt for: {tx_hash}")
-            # --- FIX: Remove request_kwargs ---
-            receipt = _w3.eth.get_transaction_receipt(tx_hash)
-            # --- END OF FIX ---
+            receipt = receipt_future.result() if receipt_future else receipt_batched # Re-raises the worker's exception, handled below as before
             if receipt: print(f"Receipt found for {tx_hash[:10]}...")
         except Exception as receipt_e:
              # Be specific about 'not found' vs other errors
@@ -757,12 +630,9 @@ def get_tx_details(_w3, tx_hash):
         timestamp = "N/A (Block Error)"
         try:
              print(f"Fetching block details for block: {receipt['blockNumber']}")
-             # --- FIX: Remove request_kwargs ---
-             block = _w3.eth.get_block(receipt['blockNumber'])
-             # --- END OF FIX ---
-             if block and 'timestamp' in block:
-                 # Use timezone aware datetime
-                 timestamp = datetime.fromtimestamp(block['timestamp'], tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')
+             block_time = get_block_timestamp(_w3, receipt['blockNumber']) # Cached per block
+             if block_time:
+                 timestamp = format_block_time(block_time)
                  print(f"Block timestamp found: {timestamp}")
              else:
                  st.warning(f"⚠️ Incomplete block data for {receipt['blockNumber']}.", icon="🧱")
@@ -809,7 +679,7 @@ def get_block_trace(_w3, block_identifier):
             block_id_lower = block_identifier.lower()
             if block_id_lower in ['latest', 'earliest', 'pending']:
                 param = block_id_lower
-            elif block_id_lower.startswith('0x') and len(block_id_lower) == 66:
+            elif _HEX_HASH.fullmatch(block_id_lower):
                 param = block_id_lower
                 is_hash = True
             else:
@@ -853,6 +723,9 @@ def get_block_trace(_w3, block_identifier):
 
 
 # --- Feature 3: Contract State Fetcher ---
+# Display name -> zero-argument view function; all of them are read in one Multicall3 eth_call
+CONTRACT_STATE_FUNCTIONS = {"Owner": "owner"} # Add more getters here once they are in the ABI
+
 @st.cache_data(ttl=300) # Cache state for 5 mins
 def get_contract_state(_contract):
     """Fetches specific public state variables from the contract."""
@@ -860,10 +733,15 @@ def get_contract_state(_contract):
         return {"Error": "Contract/Connection unavailable"}
 
     state = {}
+    try: # One round trip for every getter; reverted reads come back as None and are retried directly below
+        batched = dict(zip(CONTRACT_STATE_FUNCTIONS, multicall3(_contract.w3, [(_contract, fn_name, []) for fn_name in CONTRACT_STATE_FUNCTIONS.values()])))
+    except Exception as multicall_e:
+        print(f"Warn: Multicall3 contract state read failed ({multicall_e}), falling back to individual calls")
+        batched = {}
     # --- Attempt to fetch common state variables ---
     # Owner
     try:
-        owner = _contract.functions.owner().call()
+        owner = batched.get("Owner") or _contract.functions.owner().call()
         state["Owner"] = owner
         state["Owner Tagged"] = get_address_label(owner) # Add tag
     except (web3_exceptions.ContractLogicError, AttributeError, KeyError): # Handle if 'owner' func doesn't exist or reverts
@@ -889,36 +767,61 @@ def get_contract_state(_contract):
 
 
 # --- Markdown Cleaner ---
+# Compiled once at import; clean_markdown runs on every chat message render
+_MD_FENCE_LANG = re.compile(r"```(?:json|python|text)\n") # One pass over the text for all specifiers
+
 def clean_markdown(text):
     """Removes specific markdown code block specifiers."""
-    # ... (Keep existing function body) ...
-    text = re.sub(r"```json\n", "```\n", text)
-    text = re.sub(r"```python\n", "```\n", text)
-    text = re.sub(r"```text\n", "```\n", text)
-    return text
+    if "```" not in text: return text # Most streamed chunks carry no fence at all
+    return _MD_FENCE_LANG.sub("```\n", text)
+
+@lru_cache(maxsize=1024) # History strings persist in session_state and keep their hash, so reruns cost one dict lookup per message
+def clean_history_markdown(text):
+    """Memoized clean_markdown for chat history re-rendered on every rerun (streamed chunks use the plain version)."""
+    return clean_markdown(text)
+
+# --- Gemini Streaming Helper ---
+def stream_gemini_text(response):
+    """Yields cleaned text chunks from a streamed Gemini response (for st.write_stream)."""
+    for chunk in response:
+        try: text = chunk.text
+        except ValueError: continue # Chunk carries no text parts (e.g. safety/finish metadata only)
+        if text: yield clean_markdown(text)
 
 # --- Configure Gemini ---
 @st.cache_resource
-def configure_gemini(api_key):
-    """Configures and returns the Gemini Generative Model."""
-    # ... (Keep existing function body, using updated SYSTEM_INSTRUCTION) ...
+def configure_gemini(api_key, today):
+    """Configures and returns the Gemini Generative Model (one cached model per day's date)."""
     if not api_key: return None
     try:
+        import google.generativeai as genai # Lazy import: skipped entirely when no Gemini key is set
         genai.configure(api_key=api_key)
         model = genai.GenerativeModel('gemini-1.5-flash-latest', # Or preferred model
-                                   system_instruction=SYSTEM_INSTRUCTION, # Use updated instructions
+                                   system_instruction=SYSTEM_INSTRUCTION_TEMPLATE.format(today=today), # Date injected per day
                                    generation_config=genai.GenerationConfig(temperature=0.7))
         print("✅ Gemini model configured.")
         return model
     except Exception as e: st.error(f"🚨 **Gemini Error:** Config failed: {e}", icon="🔥"); return None
 
-gemini_model = configure_gemini(GEMINI_API_KEY)
+@st.cache_resource
+def configure_gemini_classifier(api_key):
+    """Returns a bare Gemini model (no system instruction) for one-word classification tasks,
+    so short prompts like news sentiment don't resend the multi-KB system instruction each call."""
+    if not api_key: return None
+    try:
+        import google.generativeai as genai # Lazy import (see configure_gemini)
+        genai.configure(api_key=api_key)
+        return genai.GenerativeModel('gemini-1.5-flash-latest', generation_config=genai.GenerationConfig(temperature=0.0))
+    except Exception as e: print(f"Gemini classifier config failed: {e}"); return None
+
+gemini_model = configure_gemini(GEMINI_API_KEY, datetime.now().strftime('%A, %B %d, %Y')) # Cached per day; the chat session itself lives in st.session_state
+gemini_classifier = configure_gemini_classifier(GEMINI_API_KEY)
 
 # --- Feature 10: AI Sentiment Analysis Helper ---
-@st.cache_data(ttl=3600) # Cache sentiment for 1 hour
+@st.cache_data(ttl=3600, max_entries=512) # Cache sentiment for 1 hour
 def get_news_sentiment(article_text):
     """Uses Gemini to get basic sentiment for news text."""
-    if not gemini_model or not article_text:
+    if not gemini_classifier or not article_text:
         return "⚪" # Neutral/Unknown default
 
     prompt = f"""Analyze the sentiment of the following news headline/snippet regarding PYUSD, stablecoins, or blockchain technology. Respond ONLY with one word: POSITIVE, NEGATIVE, or NEUTRAL.
@@ -927,8 +830,8 @@ def get_news_sentiment(article_text):
 
     Sentiment:"""
     try:
-        # Use a separate chat instance or direct generate_content for single tasks
-        response = gemini_model.generate_content(prompt)
+        # Direct generate_content on the lightweight classifier model (no chat/system instruction)
+        response = gemini_classifier.generate_content(prompt)
         sentiment_text = response.text.strip().upper()
 
         if "POSITIVE" in sentiment_text: return "🟢"
@@ -938,9 +841,42 @@ def get_news_sentiment(article_text):
         print(f"Error getting news sentiment from Gemini: {e}")
         return "⚪" # Default on error
 
+SENTIMENT_EMOJI = {"POSITIVE": "🟢", "NEGATIVE": "🔴", "NEUTRAL": "⚪"}
+_SENTIMENT_LINE = re.compile(r"^\W*(\d+)\W+(POSITIVE|NEGATIVE|NEUTRAL)\b", re.MULTILINE)
+
+@st.cache_data(ttl=3600, max_entries=64) # Same lifetime as the per-article cache
+def get_news_sentiments(article_texts):
+    """Classifies a tuple of news texts in a single Gemini call; returns one emoji per text.
+    Falls back to per-article get_news_sentiment for any line the model leaves out."""
+    if not gemini_classifier or not article_texts:
+        return ["⚪"] * len(article_texts)
+
+    numbered = "\n".join(f'{i}. "{text}"' for i, text in enumerate(article_texts, start=1))
+    prompt = f"""Analyze the sentiment of each numbered news headline/snippet below regarding PYUSD, stablecoins, or blockchain technology. Respond ONLY with one line per item in the form "<number>. <SENTIMENT>", where SENTIMENT is POSITIVE, NEGATIVE, or NEUTRAL.
+
+    {numbered}
+
+    Sentiments:"""
+    labels = {}
+    try:
+        response = gemini_classifier.generate_content(prompt)
+        labels = {int(num): label for num, label in _SENTIMENT_LINE.findall(response.text.upper())}
+    except Exception as e:
+        print(f"Error getting batched news sentiment from Gemini: {e}")
+    if len(labels) < len(article_texts): print(f"Batched sentiment covered {len(labels)}/{len(article_texts)} articles; classifying the rest individually.")
+    return [SENTIMENT_EMOJI[labels[i]] if i in labels else get_news_sentiment(text) for i, text in enumerate(article_texts, start=1)]
+
+
+# --- Shared HTTP Session (NewsAPI) ---
+@st.cache_resource
+def get_http_session():
+    """Returns a process-wide requests.Session so NewsAPI calls reuse pooled keep-alive TLS connections."""
+    session = requests.Session()
+    session.headers.update({"User-Agent": "pyusd-cybermatrix-dashboard"})
+    return session
 
 # --- News API Fetching (Modified for Sentiment - Feature 10) ---
-@st.cache_data(ttl=1800) # Cache news+sentiment for 30 minutes
+@st.cache_data(ttl=1800, max_entries=32) # Cache news+sentiment for 30 minutes
 def fetch_news_from_newsapi(api_key, keywords):
     """Fetches news from NewsAPI and adds basic sentiment."""
     # ... (Keep existing NewsAPI logic) ...
@@ -958,39 +894,35 @@ def fetch_news_from_newsapi(api_key, keywords):
     processed_news = []
     progress_bar = None # Initialize progress bar variable
     try:
-        response = requests.get(base_url, params=params, timeout=15) # Increased timeout
+        response = get_http_session().get(base_url, params=params, timeout=15) # Pooled connection, increased timeout
         response.raise_for_status()
-        data = response.json()
+        data = _json_loads(response.content)
 
         if data.get("status") == "ok":
             articles = data.get("articles", [])
             print(f"NewsAPI returned {len(articles)} articles.")
             if articles: # Only show progress if there are articles
-                #Use st.progress for sentiment fetching if many articles
-                progress_bar = st.progress(0, text="Analyzing news sentiment...")
-                for i, article in enumerate(articles):
+                # Parse every publishedAt in one vectorized pass; unparseable values keep their raw text
+                raw_dates = pd.Series([article.get('publishedAt') or None for article in articles], dtype=object)
+                parsed_dates = pd.to_datetime(raw_dates, format='%Y-%m-%dT%H:%M:%SZ', utc=True, errors='coerce')
+                publish_dates = parsed_dates.dt.strftime('%b %d, %Y %H:%M UTC').where(parsed_dates.notna(), raw_dates.fillna("Date unavailable")) # Abbreviated month
+                for article, publish_date_str in zip(articles, publish_dates):
                     title = article.get('title', 'No Title Provided')
                     link = article.get('url', '#')
                     snippet = article.get('description', article.get('content', 'No snippet available.'))
                     if snippet and len(snippet) > 250: snippet = snippet[:247] + "..."
-                    raw_date = article.get('publishedAt')
-                    publish_date_str = "Date unavailable"
-                    if raw_date:
-                        try:
-                            parsed_date_utc = datetime.strptime(raw_date, '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
-                            publish_date_str = parsed_date_utc.strftime('%b %d, %Y %H:%M UTC') # Abbreviated month
-                        except (ValueError, TypeError): publish_date_str = raw_date
-
-                    # --- Feature 10 Integration ---
-                    sentiment_text = title + " " + snippet if snippet else title
-                    sentiment_emoji = get_news_sentiment(sentiment_text[:500]) # Limit text sent to AI
-                    # --- End Feature 10 ---
 
                     processed_news.append({
                         'title': title, 'link': link, 'snippet': snippet,
-                        'date': publish_date_str, 'sentiment': sentiment_emoji # Add sentiment
+                        'date': publish_date_str
                     })
-                    progress_bar.progress((i + 1) / len(articles), text=f"Analyzing sentiment... ({i+1}/{len(articles)})")
+
+                # --- Feature 10 Integration: one batched Gemini call for every article ---
+                progress_bar = st.progress(0, text=f"Analyzing news sentiment for {len(processed_news)} articles...")
+                sentiment_texts = tuple((item['title'] + " " + item['snippet'] if item['snippet'] else item['title'])[:500] # Limit text sent to AI
+                                        for item in processed_news)
+                for item, sentiment_emoji in zip(processed_news, get_news_sentiments(sentiment_texts)):
+                    item['sentiment'] = sentiment_emoji
                 progress_bar.empty() # Clear progress bar
             print(f"Processed {len(processed_news)} news items from NewsAPI with sentiment.")
             return processed_news
@@ -1017,123 +949,429 @@ def fetch_news_from_newsapi(api_key, keywords):
 
 
 # --- Event Fetching Base Function (Internal) ---
-def _fetch_events_base(w3_conn, contract_obj, event_name, process_func, from_block, to_block):
-    """Internal helper to fetch and process events."""
-    try:
-        event_obj = getattr(contract_obj.events, event_name)
-        logs = event_obj.get_logs(from_block=from_block, to_block=to_block)
+RPC_BATCH_WAVE = 8 # eth_getLogs subranges sent together in one JSON-RPC batch (fan-out width)
+BLOCK_BATCH_SIZE = 100 # get_block calls per JSON-RPC batch when resolving timestamps
+
+def _event_log_filter(event_names, from_block, to_block):
+    """Builds the eth_getLogs filter for one or more PYUSD events (topic-OR on topic0)."""
+    return {
+        "address": PYUSD_CONTRACT_ADDRESS,
+        "fromBlock": from_block,
+        "toBlock": to_block,
+        "topics": [[EVENT_TOPICS[name] for name in event_names]], # OR-filter on topic0
+    }
 
-        if not logs:
-            return [] # No events found in this range
+def _get_event_logs(w3_conn, event_names, from_block, to_block):
+    """Fetches raw logs for one or more PYUSD events with a single topic-OR eth_getLogs call."""
+    return w3_conn.eth.get_logs(_event_log_filter(event_names, from_block, to_block))
+
+def _batched_calls(w3_conn, method, args_list, batching, single_call=None):
+    """Runs method(*args) for every args tuple in one JSON-RPC batch; returns the results in order.
+    If the batch fails for anything but a timeout/rate limit (e.g. the provider rejects batches), the
+    calls are repeated one by one with single_call (default: method). When those succeed the batch itself
+    was the problem, so batching[0] is cleared and later waves of the same fetch skip it; errors from
+    the single calls propagate as usual."""
+    single_call = single_call or method
+    if batching[0] and len(args_list) > 1:
+        try:
+            with w3_conn.batch_requests() as batch:
+                for args in args_list:
+                    batch.add(method(*args))
+                return batch.execute()
+        except Exception as batch_e:
+            if isinstance(batch_e, requests.Timeout) or (isinstance(batch_e, HTTPError) and batch_e.response is not None
+                                                          and batch_e.response.status_code in RETRYABLE_HTTP_STATUS):
+                raise # Load signals, not a batching problem: leave them to the caller's retry logic
+            print(f"Warn: JSON-RPC batch of {len(args_list)} calls failed ({type(batch_e).__name__}: {batch_e}), retrying as single calls")
+            results = [single_call(*args) for args in args_list]
+            batching[0] = False # Single calls worked, so the provider refused the batch itself
+            return results
+    return [single_call(*args) for args in args_list]
+
+def _get_event_logs_batch(w3_conn, event_names, ranges, batching=None):
+    """Fetches raw logs for several (from, to) block subranges in one JSON-RPC batch,
+    so the wave costs a single round trip instead of one per subrange. Falls back to one
+    eth_getLogs per subrange on providers that reject batches (see _batched_calls)."""
+    if len(ranges) == 1:
+        return _get_event_logs(w3_conn, event_names, *ranges[0])
+    responses = _batched_calls(w3_conn, w3_conn.eth.get_logs, [(_event_log_filter(event_names, start, end),) for start, end in ranges],
+                               batching if batching is not None else [True])
+    return [log for logs in responses for log in logs]
+
+def _get_block_timestamps(w3_conn, block_nums):
+    """Resolves block timestamps with batched get_block calls, skipping blocks already in the
+    shared timestamp store or the on-disk cache. Returns {block number: datetime or None}."""
+    store = _block_timestamp_store()
+    timestamps = {block_num: store[block_num] for block_num in block_nums if block_num in store}
+    missing = [block_num for block_num in block_nums if block_num not in timestamps]
+    if missing: # Finalized timestamps persisted by earlier runs/processes
+        persisted = w3_conn.provider.load_block_timestamps(missing)
+        timestamps.update({block_num: datetime.fromtimestamp(ts, tz=timezone.utc) for block_num, ts in persisted.items()})
+        missing = [block_num for block_num in missing if block_num not in persisted]
+    def get_block_or_none(block_num):
+        try: return w3_conn.eth.get_block(block_num)
+        except Exception as ts_e:
+            print(f"Warn: Timestamp fetch error block {block_num}: {ts_e}")
+            return None
 
-        processed_events = []
-        # Cache timestamps for efficiency within this fetch
-        timestamps_cache = {}
-        unique_block_nums = sorted(list(set(log['blockNumber'] for log in logs)))
+    fetched = {}
+    batching = [True] # Cleared after the first rejected batch so later waves don't pay for it again
+    for i in range(0, len(missing), BLOCK_BATCH_SIZE):
+        wave = missing[i:i + BLOCK_BATCH_SIZE]
+        blocks = _batched_calls(w3_conn, w3_conn.eth.get_block, [(block_num,) for block_num in wave], batching, single_call=get_block_or_none)
+        for block_num, block in zip(wave, blocks):
+            timestamps[block_num] = datetime.fromtimestamp(block['timestamp'], tz=timezone.utc) if block and 'timestamp' in block else None
+            if timestamps[block_num]: fetched[block_num] = block['timestamp']
+
+    if fetched: w3_conn.provider.save_block_timestamps(fetched)
+    if len(store) > BLOCK_TIMESTAMP_STORE_MAX: store.clear() # Crude bound on memory use
+    store.update({block_num: ts for block_num, ts in timestamps.items() if ts is not None})
+    return timestamps
+
+def _logs_to_raw_df(logs):
+    """Flattens raw logs into one DataFrame: int64 block, tx hash, hex topic0-2 and the first data word as an int."""
+    topics = [log['topics'] for log in logs]
+    return pd.DataFrame({
+        "Block": np.fromiter((log['blockNumber'] for log in logs), dtype=np.int64, count=len(logs)),
+        "Tx Hash": [log['transactionHash'].hex() for log in logs],
+        "topic0": [Web3.to_hex(t[0]) for t in topics],
+        "topic1": [Web3.to_hex(t[1]) if len(t) > 1 else None for t in topics],
+        "topic2": [Web3.to_hex(t[2]) if len(t) > 2 else None for t in topics],
+        "value": [int.from_bytes(log['data'][:32], "big") for log in logs], # uint256 word; Python ints (overflows int64)
+    })
+
+def _process_logs(w3_conn, contract_obj, process_funcs, logs):
+    """Resolves block timestamps, flattens raw logs into a DataFrame and hands each topic0 group
+    to its processing function. Returns {event name: DataFrame}. Raises on ABI/RPC errors."""
+    for name in process_funcs:
+        getattr(contract_obj.events, name) # Raises if the event is missing from the ABI
+    results = {name: pd.DataFrame() for name in process_funcs}
+    if not logs:
+        return results # No events found in this range
+
+    # Decode each event type as a whole frame (string slicing instead of the per-log ABI codec)
+    raw_df = _logs_to_raw_df(logs)
+
+    # Resolve timestamps once per unique block (np.unique returns them sorted), batched to cut round trips
+    unique_block_nums = np.unique(raw_df["Block"].to_numpy()).tolist()
+    raw_df["Timestamp"] = raw_df["Block"].map(_get_block_timestamps(w3_conn, unique_block_nums))
+    for topic0, group in raw_df.groupby("topic0", sort=False):
+        event_name = TOPIC_TO_EVENT.get(topic0)
+        if event_name not in process_funcs: continue
+        processed = process_funcs[event_name](group.reset_index(drop=True))
+        if processed is not None:
+            results[event_name] = processed
+
+    return results
+
+def _fetch_events_multi(w3_conn, contract_obj, process_funcs, from_block, to_block):
+    """Internal helper to fetch several event types with topic-OR eth_getLogs calls and process them.
+    `process_funcs` maps event name -> processing function. Returns {event name: DataFrame} (see _process_logs) or None on error."""
+    event_label = "/".join(process_funcs) # For error messages
+    try:
+        # Small ranges are a single call; wide ones go out as concurrent block-window chunks that shrink on provider limits
+        logs = fetch_logs_chunked(w3_conn, list(process_funcs), from_block, to_block)
+        return _process_logs(w3_conn, contract_obj, process_funcs, logs)
 
-        # Fetch timestamps efficiently (can still be slow for many unique blocks)
-        # Consider adding a progress bar here if block range is large
-        for block_num in unique_block_nums:
-            if block_num not in timestamps_cache:
-                try:
-                    block = w3_conn.eth.get_block(block_num)
-                    timestamps_cache[block_num] = datetime.fromtimestamp(block['timestamp'], tz=timezone.utc) if block and 'timestamp' in block else None
-                except Exception as ts_e:
-                    print(f"Warn: Timestamp fetch error block {block_num}: {ts_e}")
-                    timestamps_cache[block_num] = None
-
-        for log in logs:
-            processed = process_func(log, timestamps_cache.get(log['blockNumber']))
-            if processed:
-                processed_events.append(processed)
-
-        return processed_events
-
-    except web3_exceptions.ABIFunctionNotFound:
-         st.error(f"❌ Event '{event_name}' not found in contract ABI. Verify ABI definition.", icon="📜")
-         print(f"ABI Error: Event '{event_name}' not found.")
+    except (web3_exceptions.ABIFunctionNotFound, web3_exceptions.ABIEventNotFound):
+         st.error(f"❌ Event '{event_label}' not found in contract ABI. Verify ABI definition.", icon="📜")
+         print(f"ABI Error: Event '{event_label}' not found.")
          return None # Indicate ABI error
     except HTTPError as http_err:
-        st.error(f"❌ HTTP Error fetching '{event_name}' events (Blocks {from_block}-{to_block}): {http_err}", icon="📡")
+        st.error(f"❌ HTTP Error fetching '{event_label}' events (Blocks {from_block}-{to_block}): {http_err}", icon="📡")
         try: st.error(f"Response: {http_err.response.text}")
         except Exception: pass
         return None # Indicate fetch error
     except Exception as e:
-        st.error(f"❌ Error processing '{event_name}' events (Blocks {from_block}-{to_block}): {e} (Type: {type(e).__name__})", icon="🔥")
-        print(f"Exception during {event_name} event fetch/processing: {e}")
+        st.error(f"❌ Error processing '{event_label}' events (Blocks {from_block}-{to_block}): {e} (Type: {type(e).__name__})", icon="🔥")
+        print(f"Exception during {event_label} event fetch/processing: {e}")
         import traceback
         traceback.print_exc()
         return None # Indicate processing error
 
+def _fetch_events_base(w3_conn, contract_obj, event_name, process_func, from_block, to_block):
+    """Internal helper to fetch and process a single event type."""
+    results = _fetch_events_multi(w3_conn, contract_obj, {event_name: process_func}, from_block, to_block)
+    return None if results is None else results[event_name]
+
+
+# --- Adaptive Block-Range Chunking (Historical eth_getLogs) ---
+# Node response time grows super-linearly with the block range, so the range per call
+# shrinks on timeouts/limit errors and grows again after consecutive successes.
+LOG_CHUNK_MIN = 50 # Smallest block range per eth_getLogs call
+LOG_CHUNK_MAX = 5000 # Largest block range per eth_getLogs call
+LOG_CHUNK_GROW_AFTER = 5 # Consecutive successful waves before doubling the range
+LOG_CHUNK_MAX_RETRIES = 3 # Failures tolerated at the minimum range before giving up
+RETRYABLE_HTTP_STATUS = {413, 429} # Payload too large / rate limited
+LOG_FETCH_WORKERS = 4 # Batched getLogs waves kept in flight at once (bounded to stay under provider rate limits)
+PROGRESS_MIN_INTERVAL = 0.1 # Seconds between progress bar redraws inside fetch loops
+
+def _throttled_progress(progress_bar):
+    """Wraps progress_bar.progress so tight loops redraw it at most every PROGRESS_MIN_INTERVAL seconds
+    (each redraw is a websocket message); completion is always drawn. Returns None for no bar."""
+    if progress_bar is None: return None
+    last_draw = [0.0]
+    def update(fraction, text=None):
+        now = time.monotonic()
+        if fraction < 1.0 and now - last_draw[0] < PROGRESS_MIN_INTERVAL: return
+        last_draw[0] = now
+        progress_bar.progress(fraction, text=text)
+    return update
+
+def _is_retryable_log_error(err):
+    """True for errors that indicate the block range (or request rate) was too large."""
+    if isinstance(err, requests.Timeout): return True
+    if isinstance(err, HTTPError): return err.response is not None and err.response.status_code in RETRYABLE_HTTP_STATUS
+    return isinstance(err, web3_exceptions.Web3RPCError) # e.g. -32005 'query returned more than 10000 results'
+
+def fetch_logs_chunked(w3_conn, event_names, from_block, to_block, initial_chunk=2000, progress_bar=None):
+    """Fetches raw logs over a block range in batched waves of chunks, several waves in flight at once,
+    halving the chunk on timeouts/limit errors and doubling it after consecutive successful waves.
+    The learned chunk size is kept in st.session_state for the next scan."""
+    chunk = max(LOG_CHUNK_MIN, min(initial_chunk, st.session_state.get("log_chunk_size", initial_chunk)))
+    total_blocks = to_block - from_block + 1
+    update_progress = _throttled_progress(progress_bar)
+    all_logs = []; successes = 0; failures = 0
+    start = from_block
+    batching = [True] # Shared by every wave of this fetch (see _batched_calls)
+
+    with ThreadPoolExecutor(max_workers=LOG_FETCH_WORKERS) as executor:
+        while start <= to_block:
+            # Plan consecutive waves of subranges; each wave is one batched request, all sent concurrently
+            waves = []; wave_start = start
+            while wave_start <= to_block and len(waves) < LOG_FETCH_WORKERS:
+                ranges = []
+                while wave_start <= to_block and len(ranges) < RPC_BATCH_WAVE:
+                    ranges.append((wave_start, min(to_block, wave_start + chunk - 1)))
+                    wave_start = ranges[-1][1] + 1
+                waves.append(ranges)
+            futures = [executor.submit(_get_event_logs_batch, w3_conn, event_names, ranges, batching) for ranges in waves]
+
+            # Keep waves in block order up to the first failure; later waves are refetched with the new chunk size
+            error = None
+            for ranges, future in zip(waves, futures):
+                try:
+                    logs = future.result()
+                except (web3_exceptions.Web3RPCError, HTTPError, requests.Timeout) as e:
+                    error = error or e
+                    continue
+                if error: continue
+                all_logs.extend(logs); start = ranges[-1][1] + 1
+                failures = 0; successes += 1
+                if successes >= LOG_CHUNK_GROW_AFTER:
+                    chunk = min(LOG_CHUNK_MAX, chunk * 2); successes = 0
+
+            if error:
+                failures = failures + 1 if chunk == LOG_CHUNK_MIN else 0
+                if not _is_retryable_log_error(error) or failures >= LOG_CHUNK_MAX_RETRIES: raise error
+                chunk = max(LOG_CHUNK_MIN, chunk // 2); successes = 0
+                print(f"Warn: getLogs from block {start} failed ({type(error).__name__}), retrying with chunk size {chunk}")
+                time.sleep(0.5 * (failures + 1)) # Back off before retrying the same subrange
+                continue
+
+            if update_progress:
+                remaining = math.ceil((to_block - start + 1) / chunk) if start <= to_block else 0
+                update_progress(min(1.0, (start - from_block) / total_blocks),
+                                text=f"Fetched blocks {from_block}-{start - 1} (chunk size {chunk}, ~{remaining} chunks left)...")
+
+    st.session_state["log_chunk_size"] = chunk
+    return all_logs
+
+# --- Bloom Pre-Filter (Sparse Historical Ranges) ---
+# Each header's 2048-bit logsBloom holds 3 bits per log address/topic (yellow paper, M3:2048).
+# Blocks whose bloom lacks the PYUSD address or every requested topic cannot contain our events.
+def _bloom_bits(item):
+    """(byte index, bit mask) pairs that `item` sets in a logsBloom."""
+    digest = Web3.keccak(primitive=item)
+    bits = []
+    for i in (0, 2, 4):
+        bit = ((digest[i] << 8) | digest[i + 1]) & 2047
+        bits.append((255 - bit // 8, 1 << (bit % 8)))
+    return tuple(bits)
+
+def _bloom_contains(bloom, item_bits):
+    """True if every bit of an item is set in the bloom (false positives possible, no false negatives)."""
+    return all(bloom[byte_index] & mask for byte_index, mask in item_bits)
+
+def _bloom_hit_ranges(w3_conn, event_names, from_block, to_block, progress_bar=None):
+    """Fetches block headers in JSON-RPC batches (single calls if the provider rejects them) and returns merged (from, to) ranges of blocks whose
+    logsBloom may hold PYUSD events. Header timestamps are stored for the later log decoding."""
+    address_bits = _bloom_bits(Web3.to_bytes(hexstr=PYUSD_CONTRACT_ADDRESS))
+    topic_bits = [_bloom_bits(Web3.to_bytes(hexstr=EVENT_TOPICS[name])) for name in event_names]
+    store = _block_timestamp_store()
+    total_blocks = to_block - from_block + 1
+    update_progress = _throttled_progress(progress_bar)
+    hit_ranges = []; batching = [True] # Single-call fallback on batch-rejecting providers (see _batched_calls)
+
+    for wave_start in range(from_block, to_block + 1, BLOCK_BATCH_SIZE):
+        block_nums = range(wave_start, min(to_block, wave_start + BLOCK_BATCH_SIZE - 1) + 1)
+        headers = _batched_calls(w3_conn, w3_conn.eth.get_block, [(block_num,) for block_num in block_nums], batching)
+        w3_conn.provider.save_block_timestamps({block_num: header['timestamp'] for block_num, header in zip(block_nums, headers)})
+        for block_num, header in zip(block_nums, headers):
+            store[block_num] = datetime.fromtimestamp(header['timestamp'], tz=timezone.utc)
+            bloom = bytes(header['logsBloom'])
+            if not (_bloom_contains(bloom, address_bits) and any(_bloom_contains(bloom, bits) for bits in topic_bits)):
+                continue
+            # Extend the previous range when contiguous (capped so a single eth_getLogs stays reasonable)
+            if hit_ranges and hit_ranges[-1][1] == block_num - 1 and block_num - hit_ranges[-1][0] < LOG_CHUNK_MAX:
+                hit_ranges[-1] = (hit_ranges[-1][0], block_num)
+            else:
+                hit_ranges.append((block_num, block_num))
+        if update_progress:
+            scanned = block_nums[-1] - from_block + 1
+            update_progress(min(1.0, scanned / total_blocks), text=f"Bloom pre-check: {scanned}/{total_blocks} headers, {len(hit_ranges)} candidate ranges...")
+    return hit_ranges
+
+def fetch_logs_bloom_filtered(w3_conn, event_names, from_block, to_block, progress_bar=None):
+    """Fetches raw logs only for blocks whose header bloom may contain the events.
+    Pays one header per block, so it only wins on sparse ranges (few blocks with PYUSD activity)."""
+    hit_ranges = _bloom_hit_ranges(w3_conn, event_names, from_block, to_block, progress_bar)
+    print(f"Bloom pre-check: {len(hit_ranges)} candidate ranges in blocks {from_block}-{to_block}")
+    waves = [hit_ranges[i:i + RPC_BATCH_WAVE] for i in range(0, len(hit_ranges), RPC_BATCH_WAVE)]
+    all_logs = []; batching = [True]
+    with ThreadPoolExecutor(max_workers=LOG_FETCH_WORKERS) as executor:
+        for logs in executor.map(lambda ranges: _get_event_logs_batch(w3_conn, event_names, ranges, batching), waves):
+            all_logs.extend(logs)
+    return all_logs
+
 
 # --- Event Processing Functions (for _fetch_events_base) ---
-def _process_transfer_event(log, timestamp):
-    """Processes a raw Transfer event log."""
-    if not token_info: return None # Need decimals
-    decimals = token_info['decimals']
-    symbol = token_info['symbol']
-    value_pyusd = log['args']['value'] / (10**decimals)
-    return {
-        "Timestamp": timestamp, "Block": log['blockNumber'], "Tx Hash": log['transactionHash'].hex(),
-        "From": log['args']['from'], "To": log['args']['to'], f"Value ({symbol})": value_pyusd,
+# Each takes the raw-log frame for one event type. Layouts follow PYUSD_ABI_EXPANDED:
+# indexed addresses in topic1/topic2, the uint256 amount in the first data word.
+def _map_unique(col, func):
+    """Applies func once per distinct value and broadcasts back (logs repeat the same few addresses heavily)."""
+    codes, uniques = pd.factorize(col)
+    mapped = np.array([func(value) for value in uniques] + [None], dtype=object) # Missing values (code -1) map to the trailing None
+    return pd.Series(mapped[codes], index=col.index)
+
+def _contains_ci(col, needle):
+    """Case-insensitive literal substring match, lower-casing each distinct value once (tags/addresses repeat heavily)."""
+    needle = needle.lower()
+    codes, uniques = pd.factorize(col)
+    hits = np.array([needle in str(value).lower() for value in uniques] + [False]) # Missing values (code -1) never match
+    return pd.Series(hits[codes], index=col.index)
+
+def _topic_to_address(topic_col):
+    """Last 20 bytes of each 32-byte topic -> checksummed address."""
+    return _map_unique(topic_col, lambda topic: to_checksum("0x" + topic[-40:]))
+
+def _label_addresses(addr_col):
+    """Column-wise get_address_label for the checksummed columns from _topic_to_address."""
+    return _map_unique(addr_col, _format_address_label)
+
+INT64_MAX = np.iinfo(np.int64).max
+RAW_AMOUNT_COLUMNS = ["Value Raw", "Amount Raw"] # Fixed-point raw units: kept for exact math, never displayed/exported
+
+def _public_columns(df):
+    """The frame without the internal raw-unit columns (for tables and CSV exports)."""
+    return df.drop(columns=RAW_AMOUNT_COLUMNS, errors="ignore")
+
+def _value_to_amount(value_col, scale):
+    """Scales raw uint256 amounts by the token's 10**decimals. Returns (raw amounts, scaled floats).
+    Raw amounts become int64 fixed-point units when they fit (PYUSD's 6 decimals make that the norm);
+    they stay object ints only when a value exceeds 2^63 (e.g. unlimited approvals).
+    Scaled amounts are always float64, so downstream filters/plots never need to coerce them."""
+    if value_col.max() <= INT64_MAX:
+        value_col = value_col.astype(np.int64)
+        return value_col, value_col / scale
+    return value_col, (value_col / scale).astype(np.float64) # Object-int division would otherwise yield an object column
+
+def _process_transfer_events(raw_df):
+    """Processes raw Transfer event logs. Value (SYMBOL) is float64 for filters/plots; Value Raw keeps exact int64 units."""
+    if TOKEN_SCALE is None: return None # Need decimals
+    symbol = TOKEN_SYMBOL
+    from_addr = _topic_to_address(raw_df["topic1"])
+    to_addr = _topic_to_address(raw_df["topic2"])
+    value_raw, value_pyusd = _value_to_amount(raw_df["value"], TOKEN_SCALE)
+    return pd.DataFrame({
+        "Timestamp": raw_df["Timestamp"], "Block": raw_df["Block"], "Tx Hash": raw_df["Tx Hash"],
+        "From": from_addr, "To": to_addr, f"Value ({symbol})": value_pyusd, "Value Raw": value_raw,
         # Add labeled addresses for Feature 6
-        "From Tagged": get_address_label(log['args']['from']),
-        "To Tagged": get_address_label(log['args']['to']),
-    }
+        "From Tagged": _label_addresses(from_addr),
+        "To Tagged": _label_addresses(to_addr),
+    })
+
+def _process_mint_events(raw_df):
+    """Processes raw Mint event logs. !!! Assumes Mint(address indexed to, uint256 amount) !!!"""
+    if TOKEN_SCALE is None: return None
+    symbol = TOKEN_SYMBOL
+    recipient = _topic_to_address(raw_df["topic1"])
+    amount_raw, amount = _value_to_amount(raw_df["value"], TOKEN_SCALE)
+    return pd.DataFrame({
+        "Timestamp": raw_df["Timestamp"], "Block": raw_df["Block"], "Tx Hash": raw_df["Tx Hash"],
+        "Recipient": recipient, f"Amount ({symbol})": amount, "Amount Raw": amount_raw,
+        "Recipient Tagged": _label_addresses(recipient),
+    })
+
+def _process_burn_events(raw_df):
+    """Processes raw Burn event logs. !!! Assumes Burn(address indexed from, uint256 amount) !!!"""
+    if TOKEN_SCALE is None: return None
+    symbol = TOKEN_SYMBOL
+    burner = _topic_to_address(raw_df["topic1"])
+    amount_raw, amount = _value_to_amount(raw_df["value"], TOKEN_SCALE)
+    return pd.DataFrame({
+        "Timestamp": raw_df["Timestamp"], "Block": raw_df["Block"], "Tx Hash": raw_df["Tx Hash"],
+        "Burner": burner, f"Amount ({symbol})": amount, "Amount Raw": amount_raw,
+        "Burner Tagged": _label_addresses(burner),
+    })
+
+def _process_approval_events(raw_df):
+    """Processes raw Approval event logs."""
+    if TOKEN_SCALE is None: return None
+    symbol = TOKEN_SYMBOL
+    owner = _topic_to_address(raw_df["topic1"])
+    spender = _topic_to_address(raw_df["topic2"])
+    value_raw, value_pyusd = _value_to_amount(raw_df["value"], TOKEN_SCALE)
+    return pd.DataFrame({
+        "Timestamp": raw_df["Timestamp"], "Block": raw_df["Block"], "Tx Hash": raw_df["Tx Hash"],
+        "Owner": owner, "Spender": spender,
+        f"Amount ({symbol})": value_pyusd, "Unlimited": value_raw == MAX_UINT256,
+        "Owner Tagged": _label_addresses(owner),
+        "Spender Tagged": _label_addresses(spender),
+    })
+
+# Event name -> processing function (used for multi-event fetches)
+EVENT_PROCESSORS = {
+    "Transfer": _process_transfer_events,
+    "Mint": _process_mint_events,
+    "Burn": _process_burn_events,
+    "Approval": _process_approval_events,
+}
 
-def _process_mint_event(log, timestamp):
-    """Processes a raw Mint event log. !!! Adjust args based on actual event !!!"""
-    if not token_info: return None
-    decimals = token_info['decimals']
-    symbol = token_info['symbol']
-    try:
-        # !!! VERIFY 'to' and 'amount' parameter names in the actual Mint event !!!
-        amount = log['args']['amount'] / (10**decimals)
-        recipient = log['args']['to']
-        return {
-            "Timestamp": timestamp, "Block": log['blockNumber'], "Tx Hash": log['transactionHash'].hex(),
-            "Recipient": recipient, f"Amount ({symbol})": amount,
-            "Recipient Tagged": get_address_label(recipient)
-        }
-    except KeyError as e:
-        st.warning(f"⚠️ Mint event processing error: Missing key {e}. Check ABI parameters.", icon="📜")
-        return None # Skip malformed/unexpected event structure
-
-def _process_burn_event(log, timestamp):
-    """Processes a raw Burn event log. !!! Adjust args based on actual event !!!"""
-    if not token_info: return None
-    decimals = token_info['decimals']
-    symbol = token_info['symbol']
-    try:
-        # !!! VERIFY 'from' and 'amount' parameter names in the actual Burn event !!!
-        amount = log['args']['amount'] / (10**decimals)
-        burner = log['args']['from']
-        return {
-            "Timestamp": timestamp, "Block": log['blockNumber'], "Tx Hash": log['transactionHash'].hex(),
-            "Burner": burner, f"Amount ({symbol})": amount,
-            "Burner Tagged": get_address_label(burner)
-        }
-    except KeyError as e:
-        st.warning(f"⚠️ Burn event processing error: Missing key {e}. Check ABI parameters.", icon="📜")
-        return None
 
-def _process_approval_event(log, timestamp):
-    """Processes a raw Approval event log."""
-    if not token_info: return None
-    decimals = token_info['decimals']
-    symbol = token_info['symbol']
-    value_pyusd = log['args']['value'] / (10**decimals)
-    is_unlimited = log['args']['value'] == MAX_UINT256
-    return {
-        "Timestamp": timestamp, "Block": log['blockNumber'], "Tx Hash": log['transactionHash'].hex(),
-        "Owner": log['args']['owner'], "Spender": log['args']['spender'],
-        f"Amount ({symbol})": value_pyusd, "Unlimited": is_unlimited,
-        "Owner Tagged": get_address_label(log['args']['owner']),
-        "Spender Tagged": get_address_label(log['args']['spender']),
-    }
+# --- Public Event Fetching Functions (using base) ---
+def _events_to_df(events_df):
+    """Returns a copy of a processed events frame sorted by block (newest first) with formatted timestamps."""
+    df = events_df.copy()
+    if not df.empty:
+        df.sort_values(by="Block", ascending=False, inplace=True) # Ensure sorted
+        # Format timestamp column nicely if present
+        if "Timestamp" in df.columns:
+             try: df['Timestamp'] = _map_unique(df['Timestamp'], format_block_time) # Formats each distinct block time once
+             except Exception as fmt_e: print(f"Timestamp formatting error: {fmt_e}")
+    return df
 
+@st.cache_data(ttl=60) # Short cache for live feeds
+def get_recent_events_dfs(_w3, _contract, event_names, num_blocks=100):
+    """Fetches recent events of several types with ONE eth_getLogs call via GCP RPC.
+    Returns {event name: DataFrame}, or None on error."""
+    if not _w3 or not _w3.is_connected() or not _contract or not token_info:
+        print(f"Event fetch precondition failed for {event_names} (w3/contract/token_info missing).")
+        return None
+
+    try:
+        latest_block = _w3.eth.block_number
+        from_block = max(0, latest_block - num_blocks + 1)
+        print(f"Fetching {'/'.join(event_names)} events from block {from_block} to {latest_block}...")
+        process_funcs = {name: EVENT_PROCESSORS[name] for name in event_names}
+        results = _fetch_events_multi(_w3, _contract, process_funcs, from_block, latest_block)
+        if results is None: return None
+        return {name: _events_to_df(events_df) for name, events_df in results.items()}
+    except Exception as e:
+        st.error(f"❌ Unexpected error fetching {'/'.join(event_names)} events: {e}", icon="🔥")
+        print(f"Unexpected error in get_recent_events_dfs for {event_names}: {e}")
+        return None
 
-# --- Public Event Fetching Functions (using base) ---
 @st.cache_data(ttl=60) # Short cache for live feeds
 def get_recent_events_df(_w3, _contract, event_name, _process_func, num_blocks=100): # <-- Added underscore here
     """Fetches recent events of a specific type via GCP RPC and returns DataFrame."""
@@ -1149,23 +1387,17 @@ def get_recent_events_df(_w3, _contract, event_name, _process_func, num_blocks=1
         print(f"Fetching '{event_name}' events from block {from_block} to {to_block}...")
 
         # Pass the processing function (with underscore in its name now) to the base function
-        event_list = _fetch_events_base(_w3, _contract, event_name, _process_func, from_block, to_block) # <-- Use _process_func here
+        events_df = _fetch_events_base(_w3, _contract, event_name, _process_func, from_block, to_block) # <-- Use _process_func here
 
-        if event_list is None: # Indicates an error during fetch/processing
+        if events_df is None: # Indicates an error during fetch/processing
              return None
-        if not event_list: # Empty list, no events found
+        if events_df.empty: # No events found
             print(f"No '{event_name}' events found in blocks {from_block}-{to_block}.")
             return pd.DataFrame() # Return empty DataFrame
 
-        print(f"Found {len(event_list)} '{event_name}' events.")
-        df = pd.DataFrame(event_list)
-        if not df.empty:
-            df.sort_values(by="Block", ascending=False, inplace=True) # Ensure sorted
-            # Format timestamp column nicely if present
-            if "Timestamp" in df.columns:
-                 try: df['Timestamp'] = pd.to_datetime(df['Timestamp'], errors='coerce').dt.strftime('%Y-%m-%d %H:%M:%S UTC')
-                 except Exception as fmt_e: print(f"Timestamp formatting error: {fmt_e}")
-            print(f"Created DataFrame for {event_name} with {len(df)} rows.")
+        print(f"Found {len(events_df)} '{event_name}' events.")
+        df = _events_to_df(events_df)
+        print(f"Created DataFrame for {event_name} with {len(df)} rows.")
         return df
 
     except Exception as e:
@@ -1173,62 +1405,83 @@ def get_recent_events_df(_w3, _contract, event_name, _process_func, num_blocks=1
         print(f"Unexpected error in get_recent_events_df for {event_name}: {e}")
         return None
 
+# --- Historical Disk Cache (Parquet) ---
+# Finalized block ranges never change, so decoded results survive restarts/sessions on disk
+HIST_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+HIST_CACHE_MIN_CONFIRMATIONS = 64 # Only persist ranges at least this far behind the head (reorg safety)
+
+def _hist_cache_path(event_name, from_block, to_block):
+    """Parquet file for one event type over one block range."""
+    return os.path.join(HIST_CACHE_DIR, f"logs_{event_name}_{from_block}_{to_block}.parquet")
+
+def load_hist_cache(event_name, from_block, to_block):
+    """Returns the cached DataFrame for the range, or None on a miss/unreadable file."""
+    path = _hist_cache_path(event_name, from_block, to_block)
+    if not os.path.exists(path): return None
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        print(f"Warn: Ignoring unreadable historical cache {path}: {e}")
+        return None
+
+def save_hist_cache(df, event_name, from_block, to_block):
+    """Writes the DataFrame for the range (zstd Parquet); failures are logged and ignored."""
+    try:
+        os.makedirs(HIST_CACHE_DIR, exist_ok=True)
+        df.to_parquet(_hist_cache_path(event_name, from_block, to_block), compression="zstd", index=False)
+    except Exception as e:
+        print(f"Warn: Could not write historical cache for {event_name} {from_block}-{to_block}: {e}")
+
+def clear_hist_cache():
+    """Deletes all cached historical Parquet files. Returns how many were removed."""
+    if not os.path.isdir(HIST_CACHE_DIR): return 0
+    removed = 0
+    for name in os.listdir(HIST_CACHE_DIR):
+        if name.endswith(".parquet"):
+            os.remove(os.path.join(HIST_CACHE_DIR, name)); removed += 1
+    return removed
+
 # --- Feature 4: Historical Event Fetching (RPC Batching) ---
 # WARNING: VERY SLOW FOR LARGE RANGES. USE WITH CAUTION.
 @st.cache_data(ttl=3600) # Cache historical data longer
-def get_historical_events_batched(_w3_conn, _contract_obj, event_name, _process_func, start_block, end_block, batch_size=1000): # <-- Added underscore to _contract_obj
+def get_historical_events_batched(_w3_conn, _contract_obj, event_name, _process_func, start_block, end_block, batch_size=1000, bloom_prefilter=False): # <-- Added underscore to _contract_obj
     """Fetches events over a range in batches. SLOW!"""
     # --- Use the argument names with underscores inside the function ---
     if not _w3_conn or not _w3_conn.is_connected() or not _contract_obj or not token_info: #<-- Use _contract_obj
         st.error("❌ Historical fetch failed: Connection/Contract/Token Info unavailable.")
         return None
 
-    st.warning(f"⚠️ Fetching historical '{event_name}' data from block {start_block} to {end_block} (Batch Size: {batch_size}). This can be very slow and may hit RPC limits.", icon="⏳")
+    cached_df = load_hist_cache(event_name, start_block, end_block)
+    if cached_df is not None:
+        st.success(f"✅ Loaded {len(cached_df)} historical '{event_name}' events ({start_block}-{end_block}) from disk cache.", icon="💾")
+        return cached_df
+
+    st.warning(f"⚠️ Fetching historical '{event_name}' data from block {start_block} to {end_block} (Initial Batch Size: {batch_size}, adapts to RPC limits). This can be very slow.", icon="⏳")
     print(f"Starting historical batch fetch for {event_name} from {start_block} to {end_block}")
 
-    all_events = []
-    total_blocks = end_block - start_block + 1
-    num_batches = math.ceil(total_blocks / batch_size)
     progress_bar_key = f"progress_{event_name}_{start_block}_{end_block}"
     if progress_bar_key not in st.session_state:
         st.session_state[progress_bar_key] = st.progress(0, text=f"Starting historical fetch for {event_name}...")
     progress_bar = st.session_state[progress_bar_key]
 
     try:
-        for i in range(num_batches):
-            batch_start = start_block + (i * batch_size)
-            batch_end = min(end_block, batch_start + batch_size - 1)
-            progress_text = f"Fetching '{event_name}' batch {i+1}/{num_batches} (Blocks {batch_start}-{batch_end})..."
-            progress_bar.progress((i + 1) / num_batches, text=progress_text)
-            print(progress_text)
-
-            # Pass the connection and processing function (with underscores) to the base function
-            batch_events = _fetch_events_base(_w3_conn, _contract_obj, event_name, _process_func, batch_start, batch_end) # <-- Use _contract_obj
-
-            if batch_events is None:
-                 st.error(f"❌ Error encountered during batch {i+1}. Stopping historical fetch.", icon="🔥")
-                 progress_bar.empty()
-                 if progress_bar_key in st.session_state: del st.session_state[progress_bar_key]
-                 return None
-            elif batch_events:
-                 all_events.extend(batch_events)
-
-            time.sleep(0.2)
+        if bloom_prefilter: # Sparse ranges: only query blocks whose header bloom may match
+            logs = fetch_logs_bloom_filtered(_w3_conn, [event_name], start_block, end_block, progress_bar=progress_bar)
+        else: # Adaptive chunking: batch_size is the starting block range per eth_getLogs call
+            logs = fetch_logs_chunked(_w3_conn, [event_name], start_block, end_block, initial_chunk=batch_size, progress_bar=progress_bar)
+        progress_bar.progress(1.0, text=f"Processing {len(logs)} '{event_name}' logs...")
+        events_df = _process_logs(_w3_conn, _contract_obj, {event_name: _process_func}, logs)[event_name]
 
         progress_bar.empty()
         if progress_bar_key in st.session_state: del st.session_state[progress_bar_key]
 
-        if not all_events:
+        if events_df.empty:
             st.info(f"ℹ️ No '{event_name}' events found in the specified historical range ({start_block}-{end_block}).")
             return pd.DataFrame()
 
-        df = pd.DataFrame(all_events)
-        # ... rest of the function remains the same ...
-        if not df.empty:
-            df.sort_values(by="Block", ascending=False, inplace=True)
-            if "Timestamp" in df.columns:
-                 try: df['Timestamp'] = pd.to_datetime(df['Timestamp'], errors='coerce').dt.strftime('%Y-%m-%d %H:%M:%S UTC')
-                 except Exception: pass # Ignore formatting errors
+        df = _events_to_df(events_df)
+        if end_block <= _w3_conn.eth.block_number - HIST_CACHE_MIN_CONFIRMATIONS: # Finalized range: persist
+            save_hist_cache(df, event_name, start_block, end_block)
         st.success(f"✅ Fetched {len(df)} historical '{event_name}' events from block {start_block} to {end_block}.", icon="💾")
         print(f"Finished historical batch fetch. Found {len(df)} events.")
         return df
@@ -1245,6 +1498,10 @@ def get_historical_events_batched(_w3_conn, _contract_obj, event_name, _process_
         return None
 
 # --- Volume Calculation ---
+def _as_numeric(values):
+    """The column itself when already numeric (processors emit float64), else a coerced copy with NaN for junk."""
+    return values if pd.api.types.is_numeric_dtype(values) else pd.to_numeric(values, errors='coerce')
+
 def calculate_transfer_volume_from_df(df, symbol):
     """Calculates total PYUSD volume from the DataFrame."""
     # ... (Keep existing function body) ...
@@ -1252,72 +1509,130 @@ def calculate_transfer_volume_from_df(df, symbol):
     if df is None or df.empty or value_col not in df.columns:
         return 0
     try:
-        return pd.to_numeric(df[value_col], errors='coerce').sum()
+        # Exact integer sum over the fixed-point column when available, one division at the end
+        if "Value Raw" in df.columns and df["Value Raw"].dtype == np.int64 and TOKEN_SCALE:
+            return int(df["Value Raw"].to_numpy().sum()) / TOKEN_SCALE
+        return float(np.nansum(_as_numeric(df[value_col]).to_numpy(dtype=np.float64)))
     except Exception as e:
         print(f"Error calculating volume: {e}")
         return 0
 
+# --- Feature 9: CSV Export ---
+@st.cache_data(max_entries=16, show_spinner=False) # Repeat downloads of an unchanged frame reuse the bytes
+def df_to_csv_bytes(df):
+    """UTF-8 CSV bytes of a DataFrame (no index) for st.download_button.
+    Passed to the buttons as a partial, so Streamlit only encodes a frame when its button is clicked.
+    Encodes with pyarrow's vectorized CSV writer; pandas to_csv is the fallback.
+    The internal raw-unit columns are left out of the file."""
+    df = _public_columns(df)
+    try:
+        import pyarrow as pa, pyarrow.csv as pa_csv # Lazy import: only needed for exports
+        buf = pa.BufferOutputStream()
+        pa_csv.write_csv(pa.Table.from_pandas(df, preserve_index=False), buf)
+        return buf.getvalue().to_pybytes()
+    except Exception as e: # pyarrow missing, or a column Arrow can't hold (e.g. object ints above uint64)
+        print(f"pyarrow CSV export unavailable ({e.__class__.__name__}), using pandas")
+        return df.to_csv(index=False).encode('utf-8')
+
 # --- Plotting Functions ---
 # Re-adding original plot functions that were missing
+PLOT_TEMPLATE = 'plotly_dark' # Shared by every chart
+PLOT_BG = dict(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)') # Transparent so the page background shows through
+
+def _plot_frame(df):
+    """Shallow copy of a transfer frame for the volume charts with From/To as categoricals,
+    so the repeated per-address groupbys hash small integer codes instead of 42-char strings.
+    Amounts stay float64: float32 would round 6-decimal PYUSD values above ~10 tokens."""
+    return df.assign(**{col: df[col].astype("category") for col in ("From", "To") if col in df.columns})
 
+@st.cache_data(ttl=300, max_entries=64, show_spinner=False) # Reruns (tab switches, unrelated widgets) reuse the figure for unchanged data
 def plot_transfers_per_block(df, symbol):
     """Generates a bar chart of transfer counts per block."""
     if df is None or df.empty or 'Block' not in df.columns: return None
     try:
         block_counts = df.groupby('Block').size().reset_index(name='Transfer Count')
         block_counts.sort_values('Block', inplace=True) # Sort by block number for chart
+        import plotly.express as px # Lazy import: plotly loads on first chart render
         fig = px.bar(block_counts, x='Block', y='Transfer Count',
                     title=f'PYUSD Transfer Count per Block (Filtered Scan)', # Updated title slightly
                     labels={'Block': 'Block Number', 'Transfer Count': 'Number of Transfers'},
-                    template='plotly_dark') # Use dark theme
-        fig.update_layout(bargap=0.2, paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
+                    template=PLOT_TEMPLATE) # Use dark theme
+        fig.update_layout(bargap=0.2, **PLOT_BG)
         fig.update_traces(marker_color='#00ffff', marker_line_color='#99ffcc', marker_line_width=1.5, opacity=0.8)
         return fig
     except Exception as e: print(f"Error plotting transfers per block: {e}"); return None
 
+@st.cache_data(ttl=300, max_entries=64, show_spinner=False) # Reruns (tab switches, unrelated widgets) reuse the figure for unchanged data
 def plot_transfer_value_distribution(df, symbol):
     """Generates a histogram of transfer values."""
     value_col = f"Value ({symbol})"
     if df is None or df.empty or value_col not in df.columns: return None
     try:
-         # Ensure numeric, drop non-numeric rows for plotting
-         df[value_col] = pd.to_numeric(df[value_col], errors='coerce')
-         df_filtered = df.dropna(subset=[value_col])
-         # Filter out zero or negative values if they exist and aren't meaningful
-         df_plot = df_filtered[df_filtered[value_col] > 0]
+         # Ensure numeric without mutating the caller's frame; non-numeric (NaN), zero and negative values drop out
+         values = _as_numeric(df[value_col])
+         df_plot = df.loc[values > 0].assign(**{value_col: values})
          if df_plot.empty: return None
 
-         fig = px.histogram(df_plot, x=value_col,
-                           title=f'Distribution of PYUSD Transfer Values (Filtered Scan)', # Updated title
-                           labels={value_col: f'Transfer Value (${symbol})'},
-                           template='plotly_dark', nbins=50, log_y=True) # Use log scale for Y axis
-         fig.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
+         # Bin server-side so the browser gets 50 bars instead of every raw transfer value
+         counts, edges = np.histogram(df_plot[value_col].to_numpy(dtype=np.float64), bins=50)
+         hist_df = pd.DataFrame({value_col: (edges[:-1] + edges[1:]) / 2, 'Transfers': counts, 'Bin Width': np.diff(edges)})
+
+         import plotly.express as px # Lazy import: plotly loads on first chart render
+         fig = px.bar(hist_df, x=value_col, y='Transfers',
+                     title=f'Distribution of PYUSD Transfer Values (Filtered Scan)', # Updated title
+                     labels={value_col: f'Transfer Value (${symbol})', 'Transfers': 'count'},
+                     template=PLOT_TEMPLATE, log_y=True) # Use log scale for Y axis
+         fig.update_traces(width=hist_df['Bin Width']) # Bars span their bins, like the client-side histogram did
+         fig.update_layout(bargap=0, **PLOT_BG)
          fig.update_traces(marker_color='#99ffcc', marker_line_color='#00ffcc', opacity=0.7)
          return fig
     except Exception as e: print(f"Error plotting value distribution: {e}"); return None
 
+@st.cache_data(ttl=300, max_entries=64, show_spinner=False) # Reruns (tab switches, unrelated widgets) reuse the figure for unchanged data
 def plot_volume_per_block(df, symbol):
     """Generates a bar chart of PYUSD volume transferred per block."""
     value_col = f"Value ({symbol})"
     if df is None or df.empty or value_col not in df.columns or 'Block' not in df.columns: return None
     try:
-        df[value_col] = pd.to_numeric(df[value_col], errors='coerce')
-        df_clean = df.dropna(subset=[value_col, 'Block'])
-        volume_per_block = df_clean.groupby('Block')[value_col].sum().reset_index()
-        volume_per_block.sort_values('Block', inplace=True)
-        if volume_per_block.empty: return None
-
+        df_clean = df.assign(**{value_col: _as_numeric(df[value_col])}).dropna(subset=[value_col, 'Block'])
+        if df_clean.empty: return None
+        # Blocks are dense small-range ints: one bincount pass replaces a hash groupby, and comes out block-sorted
+        blocks = df_clean['Block'].to_numpy(dtype=np.int64)
+        first_block = blocks.min()
+        sums = np.bincount(blocks - first_block, weights=df_clean[value_col].to_numpy(dtype=np.float64))
+        present = np.bincount(blocks - first_block).nonzero()[0] # Blocks with transfers (even if their volume sums to 0)
+        volume_per_block = pd.DataFrame({'Block': present + first_block, value_col: sums[present]})
+
+        import plotly.express as px # Lazy import: plotly loads on first chart render
         fig = px.bar(volume_per_block, x='Block', y=value_col,
                     title=f'PYUSD Volume per Block (Analysis Scan)', # Updated title
                     labels={'Block': 'Block Number', value_col: f'Volume (${symbol})'},
-                    template='plotly_dark')
-        fig.update_layout(bargap=0.2, paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
+                    template=PLOT_TEMPLATE)
+        fig.update_layout(bargap=0.2, **PLOT_BG)
         fig.update_traces(marker_color='#ff9933', marker_line_color='#ccff00', marker_line_width=1.5, opacity=0.8)
         return fig
     except Exception as e: print(f"Error plotting volume per block: {e}"); return None
 
 
+def top_address_labels(df, symbol, direction='From', top_n=3):
+    """Labels of the top_n addresses in the From/To column by summed volume (plain aggregation, no figure)."""
+    volumes = _as_numeric(df[f"Value ({symbol})"]).groupby(df[direction], sort=False, observed=True).sum()
+    return [get_address_label(address) for address in volumes.nlargest(top_n).index]
+
+@st.cache_data(ttl=300, max_entries=32, show_spinner=False) # Re-clicks on unchanged scan results reuse the answer instead of a new Gemini call
+def summarize_volume(blocks, symbol, total_vol, n_transfers, top_senders, top_receivers):
+    """Asks Gemini for 2-3 insights on a volume scan summary; returns cleaned markdown.
+    Takes only plain scalars/tuples so the cache key is cheap to hash."""
+    prompt = f"""Analyze the following PYUSD transfer data summary from the last {blocks} blocks and provide 2-3 key insights in a concise, cyberpunk-themed bulleted list:
+    - Total Transfers: {n_transfers}
+    - Total Volume: ${total_vol:,.2f} {symbol}
+    - Top 3 Senders (by Volume): {", ".join(top_senders) or "N/A"}
+    - Top 3 Receivers (by Volume): {", ".join(top_receivers) or "N/A"}
+    Focus on significant patterns or large movements. Be brief."""
+    return clean_markdown(gemini_model.generate_content(prompt).text)
+
 # --- Pie Chart Plotting (Modified for Tags) ---
+@st.cache_data(ttl=300, max_entries=64, show_spinner=False) # Reruns (tab switches, unrelated widgets) reuse the figure for unchanged data
 def plot_top_addresses_pie(df, symbol, direction='From', top_n=10):
     """Generates pie chart for top addresses by volume, using tagged labels."""
     value_col = f"Value ({symbol})"
@@ -1332,46 +1647,43 @@ def plot_top_addresses_pie(df, symbol, direction='From', top_n=10):
     if not token_data_local: token_data_local = {'decimals': 6} # Fallback
 
     try:
-        df[value_col] = pd.to_numeric(df[value_col], errors='coerce')
+        values = _as_numeric(df[value_col]) # Never written back: cached builders must not mutate their input
         # Group by the TAGGED address, but keep original address for hover data
         # We need to aggregate both the tagged label and the original address
         # This requires a more complex aggregation if multiple original addresses map to the same tag (unlikely with current simple tagging)
         # For now, group by original address, sum volume, then add the tag for the top N
-        address_volume = df.groupby(original_address_col)[value_col].sum().reset_index()
-
-        address_volume = address_volume[address_volume[value_col] > 0]
-        address_volume.sort_values(value_col, ascending=False, inplace=True)
+        address_volume = values.groupby(df[original_address_col], sort=False, observed=True).sum() # Hash aggregation, no key sort
+        address_volume = address_volume[address_volume > 0]
         if address_volume.empty: return None
+        top_volume = address_volume.nlargest(top_n) # Partial selection instead of a full sort
+        other_sum = address_volume.sum() - top_volume.sum() if len(address_volume) > top_n else 0
+        top_df = top_volume.reset_index()
 
         # Aggregate smaller amounts into 'Other'
-        if len(address_volume) > top_n:
-            top_df = address_volume.head(top_n)
-            other_sum = address_volume.iloc[top_n:][value_col].sum()
-            if other_sum > 1e-9: # Only add 'Other' if sum is significant
-                 # For 'Other', use a placeholder label and address
-                other_df = pd.DataFrame([{original_address_col: 'Other Addresses', value_col: other_sum}])
-                final_df = pd.concat([top_df, other_df], ignore_index=True)
-            else: final_df = top_df
-        else: final_df = address_volume
-
-        # Apply tagging to the final aggregated list for display names
-        final_df[address_col] = final_df[original_address_col].apply(
-             lambda addr: KNOWN_ADDRESSES.get(addr, f"{addr[:6]}...{addr[-4:]}") if addr != 'Other Addresses' else 'Other Addresses'
-        )
+        if other_sum > 1e-9: # Only add 'Other' if sum is significant
+            # For 'Other', use a placeholder label and address
+            other_df = pd.DataFrame([{original_address_col: 'Other Addresses', value_col: other_sum}])
+            final_df = pd.concat([top_df, other_df], ignore_index=True)
+        else: final_df = top_df
 
+        # Apply tagging to the final aggregated list for display names (known label, else short form)
+        addresses = final_df[original_address_col].astype(str) # Plain strings (the column may be categorical)
+        short_addresses = addresses.str.slice(0, 6) + "..." + addresses.str.slice(-4)
+        tagged_labels = addresses.map({**KNOWN_ADDRESSES, 'Other Addresses': 'Other Addresses'}).fillna(short_addresses)
 
-        direction_label = "Sender" if direction == 'From' else "Recipient"
-        fig = px.pie(final_df, names=address_col, values=value_col, # Use tagged name for pie slices
-                    hover_data=[original_address_col], # Show full original address on hover
-                    hole=0.3, template='plotly_dark',
-                    title=f'Top {min(top_n, len(address_volume))} {direction_label} Addresses by Volume (${symbol})')
 
+        direction_label = "Sender" if direction == 'From' else "Recipient"
+        import plotly.graph_objects as go # Lazy import: plotly loads on first chart render
         cyberpunk_colors = ['#00ffff', '#ff9933', '#99ffcc', '#ccff00', '#ff00ff', '#ffff00', '#ff4500', '#00ff7f', '#8a2be2', '#ffa500', '#ff69b4']
-        fig.update_traces(textposition='inside', textinfo='percent', insidetextorientation='radial',
-                          marker_colors=cyberpunk_colors, pull=[0.05] * len(final_df),
-                          # Custom hover template: Use customdata[0] for the original address
-                          hovertemplate = f"<b>Address:</b> %{{customdata[0]}}<br><b>Label:</b> %{{label}}<br><b>Volume ({symbol}):</b> %{{value:,.{token_data_local['decimals']}f}}<br><b>Percentage:</b> %{{percent}}<extra></extra>")
-        fig.update_layout(legend_title_text=f'{direction_label}s', paper_bgcolor='rgba(0,0,0,0)',
+        # Data is already aggregated: build the trace directly instead of going through plotly.express
+        fig = go.Figure(go.Pie(labels=tagged_labels.to_numpy(), values=final_df[value_col].to_numpy(), # Tagged name for pie slices
+                               customdata=addresses.to_numpy()[:, None], # Full original address on hover
+                               hole=0.3, textposition='inside', textinfo='percent', insidetextorientation='radial',
+                               marker_colors=cyberpunk_colors, pull=[0.05] * len(final_df),
+                               # Custom hover template: Use customdata[0] for the original address
+                               hovertemplate = f"<b>Address:</b> %{{customdata[0]}}<br><b>Label:</b> %{{label}}<br><b>Volume ({symbol}):</b> %{{value:,.{token_data_local['decimals']}f}}<br><b>Percentage:</b> %{{percent}}<extra></extra>"))
+        fig.update_layout(template=PLOT_TEMPLATE, title_text=f'Top {min(top_n, len(address_volume))} {direction_label} Addresses by Volume (${symbol})',
+                          legend_title_text=f'{direction_label}s', **PLOT_BG,
                           legend=dict(traceorder="reversed", title=f'{direction_label}s (Top {min(top_n, len(final_df))})', font=dict(size=10), itemsizing='constant'),
                           uniformtext_minsize=8, uniformtext_mode='hide')
         return fig
@@ -1380,101 +1692,103 @@ def plot_top_addresses_pie(df, symbol, direction='From', top_n=10):
 
 
 # --- Feature 5: Network Graph Plotting ---
+@st.cache_data(max_entries=32) # Unrelated widget changes rerun the script; reuse the HTML for an unchanged graph
+def build_network_graph_html(edges):
+    """Renders the pyvis HTML for (from, to, from tagged, to tagged, volume, count) edges."""
+    # Create pyvis network
+    from pyvis.network import Network # Lazy import: only needed for the network graph
+    net = Network(notebook=True, cdn_resources=GRAPH_CDN_RESOURCES, height='600px', width='100%', bgcolor='#00050a', font_color='#99ffcc', filter_menu=True) # Dark background, cyberpunk font color
+
+    # Add nodes and edges (node labels reuse the tags computed at ingest instead of re-slicing each address)
+    nodes = {edge[0]: edge[2] for edge in edges} | {edge[1]: edge[3] for edge in edges}
+    for node, label in nodes.items():
+        title = f"Address: {node}\nKnown As: {KNOWN_ADDRESSES.get(node, 'N/A')}" # Hover title
+        color = '#ff9933' if node in KNOWN_ADDRESSES else '#00ffff' # Different color for known addresses
+        net.add_node(node, label=label, title=title, color=color, shape='dot', size=15) # Dot shape
+
+    # Scale edge width based on volume (log scale, capped between 1 and 10), for all edges at once
+    widths = np.clip(np.log10(np.fromiter((edge[4] for edge in edges), dtype=np.float64, count=len(edges)) + 1), 1, 10).tolist()
+    for (from_node, to_node, from_tagged, to_tagged, volume, count), width in zip(edges, widths):
+        title = f"From: {from_tagged}\nTo: {to_tagged}\nVolume: ${volume:,.2f}\nTransfers: {count}"
+        net.add_edge(from_node, to_node, title=title, value=volume, width=width, color='#99ffcc') # Mint color for edges
+
+    # Configure physics and interaction
+    net.set_options("""
+    var options = {
+      "nodes": {
+        "font": {
+          "size": 12,
+          "face": "Orbitron"
+        },
+        "borderWidth": 2,
+         "borderWidthSelected": 4
+      },
+      "edges": {
+        "color": {
+          "inherit": false
+        },
+        "smooth": {
+          "type": "continuous",
+           "forceDirection": "none",
+            "roundness": 0.2
+        }
+      },
+       "interaction": {
+        "hover": true,
+        "tooltipDelay": 200,
+        "navigationButtons": true,
+         "keyboard": true
+      },
+      "physics": {
+        "barnesHut": {
+          "gravitationalConstant": -8000,
+          "centralGravity": 0.3,
+          "springLength": 120,
+          "springConstant": 0.04,
+          "damping": 0.09
+        },
+        "maxVelocity": 146,
+         "solver": "barnesHut",
+        "timestep": 0.35,
+        "adaptiveTimestep": true,
+        "stabilization": {"iterations": 50, "onlyDynamicEdges": false}
+      }
+    }
+    """)
+
+    return net.generate_html()
+
+@st.cache_data(ttl=300, max_entries=64, show_spinner=False) # Same keying as the pie charts: reruns skip the edge aggregation too, not just the pyvis render
 def plot_network_graph(df, symbol, value_threshold=1000, top_n_edges=50):
-    """Generates an interactive network graph using pyvis."""
+    """Generates an interactive network graph using pyvis. Returns the graph HTML (or None)."""
     value_col = f"Value ({symbol})"
     if df is None or df.empty or 'From' not in df.columns or 'To' not in df.columns or value_col not in df.columns:
         return None
 
     try:
         # Filter data for graph
-        df_graph = df[[ 'From', 'To', value_col, 'From Tagged', 'To Tagged']].copy() # Include tagged columns
-        df_graph[value_col] = pd.to_numeric(df_graph[value_col], errors='coerce')
-        df_graph.dropna(subset=[value_col], inplace=True)
-        df_graph = df_graph[df_graph[value_col] >= value_threshold] # Filter by minimum value
-
-        # Aggregate volume between pairs
-        agg_graph = df_graph.groupby(['From', 'To', 'From Tagged', 'To Tagged']).agg(
-             total_volume=(value_col, 'sum'),
-             transfer_count=(value_col, 'size')
+        values = _as_numeric(df[value_col])
+        df_graph = df.loc[values >= value_threshold, ['From', 'To']].assign(**{value_col: values}) # Filter by minimum value (NaN drops out)
+
+        # Aggregate volume between pairs in one pass over the value column only
+        agg_graph = df_graph.groupby(['From', 'To'], sort=False, observed=True)[value_col].agg(
+             total_volume='sum', transfer_count='size'
         ).reset_index()
 
-        # Limit number of edges for performance/clarity
-        agg_graph.sort_values('total_volume', ascending=False, inplace=True)
-        agg_graph = agg_graph.head(top_n_edges)
+        # Limit number of edges for performance/clarity, then tag just the surviving endpoints
+        agg_graph = agg_graph.nlargest(top_n_edges, 'total_volume')
+        agg_graph['From Tagged'] = _label_addresses(agg_graph['From'])
+        agg_graph['To Tagged'] = _label_addresses(agg_graph['To'])
 
         if agg_graph.empty:
             st.info(f"No transfers found above ${value_threshold:,.2f} threshold for network graph.")
             return None
 
-        # Create pyvis network
-        net = Network(notebook=True, cdn_resources='in_line', height='600px', width='100%', bgcolor='#00050a', font_color='#99ffcc', filter_menu=True) # Dark background, cyberpunk font color
-
-        # Add nodes and edges
-        nodes = set(agg_graph['From']).union(set(agg_graph['To']))
-        for node in nodes:
-            label = KNOWN_ADDRESSES.get(node, f"{node[:6]}...{node[-4:]}") # Use tagging for node label
-            title = f"Address: {node}\nKnown As: {KNOWN_ADDRESSES.get(node, 'N/A')}" # Hover title
-            color = '#ff9933' if node in KNOWN_ADDRESSES else '#00ffff' # Different color for known addresses
-            net.add_node(node, label=label, title=title, color=color, shape='dot', size=15) # Dot shape
-
-        for _, row in agg_graph.iterrows():
-            from_node, to_node = row['From'], row['To']
-            volume = row['total_volume']
-            count = row['transfer_count']
-
-            # Scale edge width based on volume (log scale often works well)
-            width = max(1, min(10, math.log10(volume + 1))) # Log scale, capped between 1 and 10
-
-            title = f"From: {row['From Tagged']}\nTo: {row['To Tagged']}\nVolume: ${volume:,.2f}\nTransfers: {count}"
-            net.add_edge(from_node, to_node, title=title, value=volume, width=width, color='#99ffcc') # Mint color for edges
-
-        # Configure physics and interaction
-        net.set_options("""
-        var options = {
-          "nodes": {
-            "font": {
-              "size": 12,
-              "face": "Orbitron"
-            },
-            "borderWidth": 2,
-             "borderWidthSelected": 4
-          },
-          "edges": {
-            "color": {
-              "inherit": false
-            },
-            "smooth": {
-              "type": "continuous",
-               "forceDirection": "none",
-                "roundness": 0.2
-            }
-          },
-           "interaction": {
-            "hover": true,
-            "tooltipDelay": 200,
-            "navigationButtons": true,
-             "keyboard": true
-          },
-          "physics": {
-            "forceAtlas2Based": {
-              "gravitationalConstant": -30,
-              "centralGravity": 0.005,
-              "springLength": 100,
-              "springConstant": 0.18
-            },
-            "maxVelocity": 146,
-             "solver": "forceAtlas2Based",
-            "timestep": 0.35,
-            "stabilization": {"iterations": 150}
-          }
-        }
-        """)
-
-        # Save to HTML and return path (or HTML content)
-        html_file = "pyusd_network_graph.html"
-        net.save_graph(html_file)
-        return html_file
+        # Edges as a hashable tuple so the rendered HTML is cached per distinct graph; zipped from whole
+        # columns (.tolist() yields plain Python values, cheap for st.cache_data to hash) rather than row by row
+        edge_columns = ['From', 'To', 'From Tagged', 'To Tagged', 'total_volume', 'transfer_count']
+        edges = tuple(zip(*(agg_graph[col].tolist() for col in edge_columns)))
+        return build_network_graph_html(edges)
 
     except Exception as e:
         st.error(f"❌ Error generating network graph: {e}", icon="🕸️")
@@ -1506,12 +1820,22 @@ def get_user_wallet_address(implant_id):
     else: st.error(f"❌ Implant ID `{implant_id}` not found in simulated DB.")
     return address
 
+ERC20_TRANSFER_SELECTOR = bytes.fromhex("a9059cbb") # First 4 bytes of keccak("transfer(address,uint256)")
+
+def _address_word(address):
+    """Left-pads a 20-byte address into a 32-byte ABI word."""
+    return Web3.to_bytes(hexstr=address).rjust(32, b"\0")
+
+def _address_topic(address):
+    """Hex form of an address as an indexed log topic (lower-case, left-padded to 32 bytes)."""
+    return "0x" + address[2:].lower().rjust(64, "0")
+
 def simulate_transaction_creation(sender_wallet, recipient_wallet, amount_pyusd, _w3, _contract):
     st.info("🛠️ Compiling Simulated PYUSD Transfer Transaction...")
     time.sleep(1.0) # Faster sim
     is_connected = _w3 and _w3.is_connected()
-    sender_valid = Web3.is_address(sender_wallet)
-    recipient_valid = Web3.is_address(recipient_wallet)
+    sender_valid = is_valid_address(sender_wallet)
+    recipient_valid = is_valid_address(recipient_wallet)
     nonce_val = "Sim (Connect/Addr Invalid)"; gas_price_gwei = "N/A"
 
     if is_connected:
@@ -1520,7 +1844,7 @@ def simulate_transaction_creation(sender_wallet, recipient_wallet, amount_pyusd,
         except Exception as gas_e: st.warning(f"⚠️ Gas price fetch error: {gas_e}", icon="⛽"); gas_price_gwei = "N/A (Error)"
 
         if sender_valid:
-             try: nonce_val = _w3.eth.get_transaction_count(Web3.to_checksum_address(sender_wallet))
+             try: nonce_val = _w3.eth.get_transaction_count(to_checksum(sender_wallet))
              except Exception as nonce_e: st.warning(f"⚠️ Nonce fetch error: {nonce_e}", icon="🔢"); nonce_val = "Sim (Nonce Error)"
 
     token_data_local = get_token_info(_contract); decimals = token_data_local['decimals'] if token_data_local else 6
@@ -1529,14 +1853,12 @@ def simulate_transaction_creation(sender_wallet, recipient_wallet, amount_pyusd,
     try:
         amount_pyusd_float = float(amount_pyusd) # Ensure it's a float
         amount_int = int(amount_pyusd_float * (10**decimals))
-    except (ValueError, TypeError): st.error(f"❌ Invalid Amount for transaction: {amount_pyusd}"); return None
+        amount_word = amount_int.to_bytes(32, "big") # uint256 ABI word (rejects negative/oversized amounts)
+    except (ValueError, TypeError, OverflowError): st.error(f"❌ Invalid Amount for transaction: {amount_pyusd}"); return None
 
-    # ERC20 transfer function signature hash: 'a9059cbb'
-    sig = "a9059cbb"
-    # Pad recipient address and amount to 32 bytes (64 hex chars)
-    to_pad = recipient_wallet[2:].lower().zfill(64) if recipient_valid else "".zfill(64)
-    amt_pad = f"{amount_int:x}".zfill(64)
-    data = f"0x{sig}{to_pad}{amt_pad}"
+    # transfer(address,uint256) calldata: selector + recipient word + amount word, hex-encoded once
+    to_word = _address_word(recipient_wallet) if recipient_valid else bytes(32)
+    data = "0x" + (ERC20_TRANSFER_SELECTOR + to_word + amount_word).hex()
 
     contract_addr_display = PYUSD_CONTRACT_ADDRESS if _contract else "N/A (Contract Error)"
 
@@ -1566,7 +1888,7 @@ def simulate_gcp_trace_transaction(transaction_details):
     gas_limit = transaction_details.get('Estimated Gas Limit', 60000)
 
     # Basic validation (as in v1.5)
-    if not all([Web3.is_address(from_addr), Web3.is_address(to_addr), Web3.is_address(contract_addr)]):
+    if not all([is_valid_address(from_addr), is_valid_address(to_addr), is_valid_address(contract_addr)]):
          st.warning("⚠️ Sim trace potentially inaccurate due to invalid addresses.", icon="🚧")
          # Use placeholder addresses if invalid to avoid errors in trace structure
          from_addr_safe = "0x"+"0"*40
@@ -1574,6 +1896,7 @@ def simulate_gcp_trace_transaction(transaction_details):
     else:
         from_addr_safe = from_addr
         to_addr_safe = to_addr
+    from_slot_key = "0x" + from_addr_safe[2:]; to_slot_key = "0x" + to_addr_safe[2:] # Stack operands reused by SLOAD/SSTORE
 
     # Simplified trace steps for an ERC20 transfer (from v1.5 example)
     trace_result = {
@@ -1583,17 +1906,17 @@ def simulate_gcp_trace_transaction(transaction_details):
         "structLogs": [
             {"pc": 0, "op": "PUSH1", "gas": hex(gas_limit-3), "gasCost": hex(3), "depth": 1, "stack": ["0x80"], "memory": [], "storage": {}, "comment": "Initial memory setup push"},
             {"pc": 50, "op": "CALLER", "gas": hex(gas_limit-100), "gasCost": hex(2), "depth": 1, "stack": [], "memory": [], "storage": {}, "comment": "Get transaction sender (msg.sender)"},
-            {"pc": 75, "op": "SLOAD", "gas": hex(gas_limit-5000), "gasCost": hex(2100), "depth": 1, "stack": ["0x...", f"0x{from_addr_safe[2:]}"], "memory": [], "storage": {}, "comment": "Load sender's balance storage slot"},
-            {"pc": 120, "op": "SSTORE", "gas": hex(gas_limit-10000), "gasCost": hex(5000), "depth": 1, "stack": ["0x...", "0x...", f"0x{from_addr_safe[2:]}"], "memory": [], "storage": {}, "comment": "Update (decrement) sender's balance in storage"},
-            {"pc": 125, "op": "SLOAD", "gas": hex(gas_limit-15000), "gasCost": hex(2100), "depth": 1, "stack": ["0x...", f"0x{to_addr_safe[2:]}"], "memory": [], "storage": {}, "comment": "Load receiver's balance storage slot"},
-            {"pc": 150, "op": "SSTORE", "gas": hex(gas_limit-20000), "gasCost": hex(5000), "depth": 1, "stack": ["0x...", "0x...", f"0x{to_addr_safe[2:]}"], "memory": [], "storage": {}, "comment": "Update (increment) receiver's balance in storage"},
+            {"pc": 75, "op": "SLOAD", "gas": hex(gas_limit-5000), "gasCost": hex(2100), "depth": 1, "stack": ["0x...", from_slot_key], "memory": [], "storage": {}, "comment": "Load sender's balance storage slot"},
+            {"pc": 120, "op": "SSTORE", "gas": hex(gas_limit-10000), "gasCost": hex(5000), "depth": 1, "stack": ["0x...", "0x...", from_slot_key], "memory": [], "storage": {}, "comment": "Update (decrement) sender's balance in storage"},
+            {"pc": 125, "op": "SLOAD", "gas": hex(gas_limit-15000), "gasCost": hex(2100), "depth": 1, "stack": ["0x...", to_slot_key], "memory": [], "storage": {}, "comment": "Load receiver's balance storage slot"},
+            {"pc": 150, "op": "SSTORE", "gas": hex(gas_limit-20000), "gasCost": hex(5000), "depth": 1, "stack": ["0x...", "0x...", to_slot_key], "memory": [], "storage": {}, "comment": "Update (increment) receiver's balance in storage"},
             {"pc": 200, "op": "LOG3", "gas": hex(sim_gas_used+500), "gasCost": hex(1875), "depth": 1,
              "stack": [
                 "0x0", # Memory start offset for data
                 "0x20", # Memory length for data (uint256 = 32 bytes)
-                "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef", # Keccak256 hash of "Transfer(address,address,uint256)"
-                f"0x{from_addr_safe[2:].lower().zfill(64)}", # Indexed 'from' address
-                f"0x{to_addr_safe[2:].lower().zfill(64)}"  # Indexed 'to' address
+                EVENT_TOPICS['Transfer'], # Keccak256 hash of "Transfer(address,address,uint256)"
+                _address_topic(from_addr_safe), # Indexed 'from' address
+                _address_topic(to_addr_safe)  # Indexed 'to' address
                 ],
              "memory": [f"0x{value_raw:064x}"], # Non-indexed 'value' in memory data part
              "storage": {}, # Storage state after this step (usually complex)
@@ -1606,6 +1929,84 @@ def simulate_gcp_trace_transaction(transaction_details):
     return trace_result
 
 
+# --- Feature 8: Address Watchlist Panel ---
+def _remove_watched_address():
+    """on_click for the remove button: runs before the panel reruns, so it redraws without the address."""
+    address = st.session_state.get("watch_remove_select")
+    if address:
+        st.session_state.watch_removed_label = st.session_state.watchlist.pop(address, address)
+        st.session_state.watch_remove_select = "" # Option is gone; reset the selection
+
+@st.fragment # Add/remove/check rerun only this panel, not every tab's RPC work
+def watchlist_panel():
+    """Sidebar watchlist: add/remove addresses and check their balances (snapshot keyed by the current block)."""
+    if 'watchlist' not in st.session_state: st.session_state.watchlist = {} # Checksum address -> label, in insertion order
+
+    new_watch_addr = st.text_input("Add Address to Watchlist", placeholder="0x...", key="watch_addr_input")
+    col_watch1, col_watch2 = st.columns([1,1])
+    with col_watch1:
+        if st.button("➕ Add", key="watch_add_btn"):
+            if is_valid_address(new_watch_addr):
+                cs_addr = to_checksum(new_watch_addr.strip())
+                if cs_addr not in st.session_state.watchlist:
+                    st.session_state.watchlist[cs_addr] = get_address_label(cs_addr) # The list below is drawn after this, so no rerun is needed
+                    st.success(f"Added {st.session_state.watchlist[cs_addr]} to watchlist.")
+                else: st.info("Address already in watchlist.")
+            elif new_watch_addr: st.error("Invalid address format.")
+    with col_watch2:
+         # Disable button if watchlist is empty or core components missing
+         disable_check_watchlist = not st.session_state.watchlist or not (rpc_ok and contract_ok and token_info)
+         if st.button("💰 Check Balances", key="watch_check_btn", disabled=disable_check_watchlist):
+             if st.session_state.watchlist:
+                 st.info("Checking balances for watched addresses...")
+                 # Display balances temporarily (could be put in main panel)
+                 watch_list = tuple(sorted(st.session_state.watchlist)) # Hashable, order-stable snapshot (cache key)
+                 try: block_hint = w3.eth.block_number # Read here: fragment reruns would otherwise reuse the last full run's block
+                 except Exception as block_e:
+                     print(f"Warn: Could not read block number for watchlist balances ({block_e}), relying on cache TTL")
+                     block_hint = None
+                 with st.spinner(f"Reading {len(watch_list)} balances..."): # All addresses in one RPC round trip; reused until the block moves
+                      balances = get_address_balances(pyusd_contract, watch_list, block_hint)
+                 results = {addr: bal if bal is not None else "Error" for addr, bal in balances.items()}
+                 # Display results (could be a table/expander)
+                 exp = st.expander("Watchlist Balances", expanded=True)
+                 for addr, bal in results.items():
+                     label = st.session_state.watchlist.get(addr, addr)
+                     if isinstance(bal, (int, float)):
+                         exp.metric(label=label, value=f"{bal:,.{token_info['decimals']}f} ${token_info['symbol']}")
+                     else: exp.metric(label=label, value=str(bal)) # Show 'Error' or 'None'
+
+    removed_label = st.session_state.pop("watch_removed_label", None)
+    if removed_label: st.success(f"Removed {removed_label}.")
+    if st.session_state.watchlist:
+        st.markdown("###### Current Watchlist:")
+        # Allow removing items
+        watch_labels = st.session_state.watchlist
+        address_to_remove = st.selectbox("Select address to remove", options=("",) + tuple(watch_labels), format_func=lambda x: watch_labels.get(x, " - "), key="watch_remove_select")
+        if address_to_remove: st.button("➖ Remove Selected", key="watch_remove_btn", on_click=_remove_watched_address)
+
+        # Simple display of the list
+        # for addr, label in st.session_state.watchlist.items():
+        #     st.text(f"- {label}")
+    else:
+        st.caption("No addresses being watched.")
+
+# --- Feature 12: Auto-Refresh Timer ---
+TRANSFER_REFRESH_SECONDS = 30
+
+@st.fragment(run_every=TRANSFER_REFRESH_SECONDS)
+def transfer_feed_refresh_timer():
+    """Reruns the app roughly every TRANSFER_REFRESH_SECONDS. The fragment tick is scheduled by the
+    browser, so no script thread sleeps in between; inline runs during a full rerun only start the clock."""
+    now = time.monotonic()
+    last_refresh = st.session_state.get("transfer_last_refresh")
+    if last_refresh is None:
+        st.session_state.transfer_last_refresh = now
+    elif now - last_refresh >= TRANSFER_REFRESH_SECONDS * 0.9: # Tolerate tick jitter
+        st.session_state.transfer_last_refresh = now
+        st.rerun() # Full app rerun: refetches the feed
+
+
 # --- Streamlit App Layout ---
 st.markdown("<h1 class='title'>🌌 PYUSD CyberMatrix Analytics v2.0 🔗</h1>", unsafe_allow_html=True) # Updated Title & Icon
 st.markdown("<p class='gcp-subtitle'>Enhanced Real-time & Historical Insights via Google Cloud RPC, NewsAPI, AI Analysis & More</p>", unsafe_allow_html=True) # Updated Subtitle
@@ -1627,6 +2028,9 @@ if rpc_ok and contract_ok and st.session_state.token_info is None:
      st.session_state.token_info = get_token_info(pyusd_contract)
 # Make token_info easily accessible
 token_info = st.session_state.get('token_info')
+# Symbol/decimals are immutable per deployment: resolve them once for the event processors and volume sums
+TOKEN_SYMBOL = token_info['symbol'] if token_info else None
+TOKEN_SCALE = 10**token_info['decimals'] if token_info else None # Divisor from raw units to tokens
 
 
 # --- Sidebar ---
@@ -1646,7 +2050,9 @@ with st.sidebar:
         st.metric(label=f"Name", value=token_info['name'])
         st.metric(label="Symbol", value=f"${token_info['symbol']}")
         st.metric(label="Decimals", value=str(token_info['decimals']))
-        st.metric(label="Total Supply", value=f"{token_info['total_supply']:,.{token_info['decimals']}f}")
+        total_supply = get_total_supply(pyusd_contract, token_info['decimals']) if rpc_ok and contract_ok else None
+        if total_supply is None: total_supply = token_info['total_supply'] # Session snapshot
+        st.metric(label="Total Supply", value=f"{total_supply:,.{token_info['decimals']}f}")
         st.metric(label="Contract", value=get_address_label(PYUSD_CONTRACT_ADDRESS))
     else:
         if rpc_ok and contract_ok: st.warning("⚠️ Token info fetch failed.")
@@ -1672,8 +2078,11 @@ with st.sidebar:
     # ... (Keep existing network status logic) ...
     if rpc_ok:
         try:
-            latest_block_num = w3.eth.block_number
-            gas_price_gwei = w3.from_wei(w3.eth.gas_price, 'gwei')
+            with ThreadPoolExecutor(max_workers=2) as executor: # Independent reads: overlap the two round trips
+                block_future = executor.submit(lambda: w3.eth.block_number)
+                gas_future = executor.submit(lambda: w3.eth.gas_price)
+                latest_block_num = block_future.result()
+                gas_price_gwei = w3.from_wei(gas_future.result(), 'gwei')
             st.metric(label="⛽ Gas Price (Gwei)", value=f"{gas_price_gwei:.2f}")
             st.metric(label="🔗 Latest Block", value=f"{latest_block_num:,}")
         except Exception as e: st.warning(f"⚠️ Network status error (GCP RPC): {e}")
@@ -1685,59 +2094,7 @@ with st.sidebar:
     # --- Feature 8: Address Watchlist ---
     st.markdown("---")
     st.markdown("### <0xF0><0x9F><0x9B><0x9E>️ Address Watchlist")
-    if 'watchlist' not in st.session_state: st.session_state.watchlist = set()
-
-    new_watch_addr = st.text_input("Add Address to Watchlist", placeholder="0x...", key="watch_addr_input")
-    col_watch1, col_watch2 = st.columns([1,1])
-    with col_watch1:
-        if st.button("➕ Add", key="watch_add_btn"):
-            if Web3.is_address(new_watch_addr):
-                cs_addr = Web3.to_checksum_address(new_watch_addr.strip())
-                if cs_addr not in st.session_state.watchlist:
-                    st.session_state.watchlist.add(cs_addr)
-                    st.success(f"Added {get_address_label(cs_addr)} to watchlist.")
-                    st.rerun() # Update display
-                else: st.info("Address already in watchlist.")
-            elif new_watch_addr: st.error("Invalid address format.")
-    with col_watch2:
-         # Disable button if watchlist is empty or core components missing
-         disable_check_watchlist = not st.session_state.watchlist or not (rpc_ok and contract_ok and token_info)
-         if st.button("💰 Check Balances", key="watch_check_btn", disabled=disable_check_watchlist):
-             if st.session_state.watchlist:
-                 st.info("Checking balances for watched addresses...")
-                 # Display balances temporarily (could be put in main panel)
-                 results = {}
-                 prog_watch = st.progress(0)
-                 watch_list = list(st.session_state.watchlist) # Iterate over a copy
-                 for i, addr in enumerate(watch_list):
-                      bal = get_address_balance(pyusd_contract, addr)
-                      results[addr] = bal if bal is not None else "Error"
-                      prog_watch.progress((i+1)/len(watch_list))
-                 prog_watch.empty()
-                 # Display results (could be a table/expander)
-                 exp = st.expander("Watchlist Balances", expanded=True)
-                 for addr, bal in results.items():
-                     label = get_address_label(addr)
-                     if isinstance(bal, (int, float)):
-                         exp.metric(label=label, value=f"{bal:,.{token_info['decimals']}f} ${token_info['symbol']}")
-                     else: exp.metric(label=label, value=str(bal)) # Show 'Error' or 'None'
-
-    if st.session_state.watchlist:
-        st.markdown("###### Current Watchlist:")
-        # Allow removing items
-        watch_list_display = list(st.session_state.watchlist)
-        address_to_remove = st.selectbox("Select address to remove", options=[""] + watch_list_display, format_func=lambda x: get_address_label(x) if x else " - ", key="watch_remove_select")
-        if address_to_remove and st.button("➖ Remove Selected", key="watch_remove_btn"):
-            st.session_state.watchlist.remove(address_to_remove)
-            st.success(f"Removed {get_address_label(address_to_remove)}.")
-            st.rerun() # Update display
-
-        # Simple display of the list
-        # for addr in st.session_state.watchlist:
-        #     st.text(f"- {get_address_label(addr)}")
-    else:
-        st.caption("No addresses being watched.")
-
+    watchlist_panel()
 
     # Resources Expander
     st.markdown("---")
@@ -1780,7 +2137,7 @@ with st.sidebar:
         with chat_display_container:
             for msg in displayed_messages: # Display only the limited history
                 with st.chat_message(msg["role"]):
-                    st.markdown(clean_markdown(msg["content"]), unsafe_allow_html=False) # Clean markdown output
+                    st.markdown(clean_history_markdown(msg["content"]), unsafe_allow_html=False) # Clean markdown output
         chat_display_container.markdown('</div>', unsafe_allow_html=True) # Close scrolling div
 
         if prompt := st.chat_input("Ask about PYUSD, blockchain...", key="gemini_prompt", disabled=(not st.session_state.get("gemini_chat"))):
@@ -1795,37 +2152,38 @@ with st.sidebar:
                     # Send message using the current full history (but only display limited)
                     # Recreate chat with history slice if necessary for context limit,
                     # but simple append is usually fine for gemini-1.5-flash
-                    resp = st.session_state.gemini_chat.send_message(prompt, stream=False)
-
-                    # Safely extract response text, check for blockage
-                    cleaned_txt = "⚠️ Response generation issue." # Default error
-
-                    # --- CORRECTED LOGIC ---
-                    # First, check if the top-level response indicates blocking
-                    if resp.prompt_feedback and resp.prompt_feedback.block_reason:
-                         cleaned_txt = f"⚠️ Response blocked: {resp.prompt_feedback.block_reason}"
-                         if resp.prompt_feedback.safety_ratings: cleaned_txt += f" (Ratings: {resp.prompt_feedback.safety_ratings})"
-                    # If not blocked at prompt level, check the candidates list
-                    elif resp.candidates: # Check if the list exists and is not empty
-                        candidate = resp.candidates[0] # Assign the first candidate object to the 'candidate' variable
-                        # Now, check the content of this specific candidate
-                        if candidate.content and candidate.content.parts:
-                            raw_txt = candidate.content.parts[0].text
-                            cleaned_txt = clean_markdown(raw_txt)
-                        # If no content, check if the candidate finished for other reasons (e.g., safety)
-                        elif candidate.finish_reason != "STOP":
-                             cleaned_txt = f"⚠️ Response stopped: {candidate.finish_reason}"
-                             # Add safety ratings from the candidate if available
-                             if hasattr(candidate, 'safety_ratings') and candidate.safety_ratings:
-                                 cleaned_txt += f" (Safety: {candidate.safety_ratings})"
-                        # If candidate exists but has no content and finished normally (unlikely but possible)
-                        else:
-                             cleaned_txt = "⚠️ Received empty response from AI."
-
-                    # --- END CORRECTED LOGIC ---
-                    else: # Handle cases where response has no candidates or other unexpected issues
-                         print(f"Gemini response issue: No valid candidates or prompt feedback found. Response: {resp}")
-                         cleaned_txt = "⚠️ Unexpected response format from AI."
+                    resp = st.session_state.gemini_chat.send_message(prompt, stream=True)
+                # Render tokens as they arrive instead of waiting for the full reply
+                with st.chat_message("assistant"):
+                    streamed_txt = st.write_stream(stream_gemini_text(resp))
+                # Safely extract response text, check for blockage (known once the stream has ended)
+                cleaned_txt = "⚠️ Response generation issue." # Default error
+
+                # --- CORRECTED LOGIC ---
+                # First, check if the top-level response indicates blocking
+                if resp.prompt_feedback and resp.prompt_feedback.block_reason:
+                     cleaned_txt = f"⚠️ Response blocked: {resp.prompt_feedback.block_reason}"
+                     if resp.prompt_feedback.safety_ratings: cleaned_txt += f" (Ratings: {resp.prompt_feedback.safety_ratings})"
+                # If not blocked at prompt level, check the candidates list
+                elif resp.candidates: # Check if the list exists and is not empty
+                    candidate = resp.candidates[0] # Assign the first candidate object to the 'candidate' variable
+                    # Now, check the content of this specific candidate
+                    if candidate.content and candidate.content.parts:
+                        cleaned_txt = streamed_txt if isinstance(streamed_txt, str) else clean_markdown(candidate.content.parts[0].text)
+                    # If no content, check if the candidate finished for other reasons (e.g., safety)
+                    elif candidate.finish_reason != "STOP":
+                         cleaned_txt = f"⚠️ Response stopped: {candidate.finish_reason}"
+                         # Add safety ratings from the candidate if available
+                         if hasattr(candidate, 'safety_ratings') and candidate.safety_ratings:
+                             cleaned_txt += f" (Safety: {candidate.safety_ratings})"
+                    # If candidate exists but has no content and finished normally (unlikely but possible)
+                    else:
+                         cleaned_txt = "⚠️ Received empty response from AI."
+
+                # --- END CORRECTED LOGIC ---
+                else: # Handle cases where response has no candidates or other unexpected issues
+                     print(f"Gemini response issue: No valid candidates or prompt feedback found. Response: {resp}")
+                     cleaned_txt = "⚠️ Unexpected response format from AI."
 
 
                 # Add response to full history
@@ -1840,6 +2198,13 @@ with st.sidebar:
                 st.session_state.messages.append({"role": "assistant", "content": f"An error occurred: {e_ai}"})
                 st.rerun() # Rerun to show error message
 
+    # Disk cache maintenance (historical Parquet files + finalized RPC responses)
+    if st.button("🧹 Clear Disk Caches", key="clear_hist_cache_btn"):
+        removed = clear_hist_cache()
+        removed_rpc = w3.provider.clear_disk_cache() if w3 else 0
+        get_historical_events_batched.clear() # Drop in-memory copies too
+        st.success(f"Removed {removed} cached historical file(s) and {removed_rpc} cached RPC entries.")
+
     # Sidebar Footer
     st.markdown("---")
     st.caption(f"© {datetime.now().year} CyberMatrix v2.0 | GCP {'OK' if rpc_ok else 'FAIL'} | Contract {'OK' if contract_ok else 'FAIL'} | NewsAPI {'OK' if NEWSAPI_API_KEY else 'NA'} | AI {'OK' if gemini_model else 'NA'}")
@@ -1902,7 +2267,7 @@ if tab_ctx := get_tab("📊 Live Transfers"):
                 results_placeholder_transfers_viz.empty()
                 with st.spinner(f"🛰️ Querying ~{transfer_blocks_scan} blocks for Transfer events..."):
                     # Use the generic event fetcher
-                    events_df = get_recent_events_df(w3, pyusd_contract, "Transfer", _process_transfer_event, num_blocks=transfer_blocks_scan)
+                    events_df = get_recent_events_df(w3, pyusd_contract, "Transfer", _process_transfer_events, num_blocks=transfer_blocks_scan)
                     st.session_state.transfers_df = events_df # Store result (DataFrame, None, or empty DF)
             else: # Should be disabled, but safety check
                  results_placeholder_transfers_viz.warning("Cannot fetch: RPC/Contract/Token Info unavailable.", icon="🚫")
@@ -1927,26 +2292,20 @@ if tab_ctx := get_tab("📊 Live Transfers"):
                      address_filter = st.text_input("Filter by Address (From/To)", placeholder="0x... or Label", key="transfer_addr_filter")
                 # Can add max_value filter in filter_cols[2] if needed
 
-                # Apply filters
-                df_filtered = df_transfers.copy()
+                # Apply filters: build one boolean mask, then select rows once
+                keep = pd.Series(True, index=df_transfers.index)
                 if min_val_filter > 0:
                      value_col = f"Value ({token_info['symbol']})"
-                     # Ensure column is numeric before filtering
-                     df_filtered[value_col] = pd.to_numeric(df_filtered[value_col], errors='coerce')
-                     df_filtered = df_filtered.dropna(subset=[value_col]) # Drop rows where conversion failed
-                     df_filtered = df_filtered[df_filtered[value_col] >= min_val_filter]
+                     keep &= _as_numeric(df_transfers[value_col]) >= min_val_filter # Non-numeric (NaN) rows compare False
 
                 if address_filter:
-                     address_filter_lower = address_filter.lower()
                      # Ensure tagged columns exist before filtering on them
-                     from_tagged_col = 'From Tagged' if 'From Tagged' in df_filtered.columns else 'From'
-                     to_tagged_col = 'To Tagged' if 'To Tagged' in df_filtered.columns else 'To'
-                     df_filtered = df_filtered[
-                         df_filtered['From'].str.lower().contains(address_filter_lower) |
-                         df_filtered['To'].str.lower().contains(address_filter_lower) |
-                         df_filtered[from_tagged_col].str.lower().contains(address_filter_lower) |
-                         df_filtered[to_tagged_col].str.lower().contains(address_filter_lower)
-                     ]
+                     address_cols = [col for col in ('From', 'To', 'From Tagged', 'To Tagged') if col in df_transfers.columns]
+                     address_match = pd.Series(False, index=df_transfers.index)
+                     for col in address_cols: # Per distinct address/tag, not per row
+                          address_match |= _contains_ci(df_transfers[col], address_filter)
+                     keep &= address_match
+                df_filtered = df_transfers if keep.all() else df_transfers[keep]
                 st.caption(f"Showing {len(df_filtered)} transfers after filtering.")
                 st.markdown("---")
 
@@ -1967,10 +2326,10 @@ if tab_ctx := get_tab("📊 Live Transfers"):
                 # Define columns including tagged versions (Feature 6)
                 display_cols = ["Timestamp", "Block", "Tx Hash", "From Tagged", "To Tagged", f"Value ({token_info['symbol']})"]
                 valid_display_cols = [col for col in display_cols if col in df_filtered.columns]
-                st.dataframe(df_filtered[valid_display_cols].head(100), hide_index=True, use_container_width=True) # Show top 100 filtered
+                st.dataframe(df_filtered.iloc[:100][valid_display_cols], hide_index=True, use_container_width=True) # Show top 100 filtered (slice rows before projecting columns)
 
                 # --- Feature 9: Data Export ---
-                csv_data = df_filtered.to_csv(index=False).encode('utf-8')
+                csv_data = partial(df_to_csv_bytes, df_filtered) # Encoded only when the button is clicked
                 st.download_button(
                      label="📥 Download Filtered Transfers (CSV)",
                      data=csv_data,
@@ -1993,11 +2352,8 @@ if tab_ctx := get_tab("📊 Live Transfers"):
 
         # --- Feature 12: Auto-Refresh Logic ---
         if auto_refresh and df_transfers is not None: # Only rerun if toggle is on AND data exists/was fetched
-            time.sleep(30) # Refresh interval
-            try:
-                 st.rerun()
-            except Exception as e:
-                 print(f"Rerun interrupted: {e}") # May happen if user interacts during sleep
+            transfer_feed_refresh_timer()
+        else: st.session_state.pop("transfer_last_refresh", None) # Next enable starts a fresh interval
 
         # >>> END SCROLLABLE CONTENT WRAPPER <<<
         st.markdown('</div>', unsafe_allow_html=True)
@@ -2034,7 +2390,7 @@ if tab_ctx := get_tab("📈 Volume & Address Analysis"):
             st.session_state.analyze_volume_addr_pressed = True
             results_placeholder_volume_addr.empty()
             with st.spinner(f"⚙️ Aggregating transfer data over ~{volume_blocks_scan} blocks..."):
-                vol_df = get_recent_events_df(w3, pyusd_contract, "Transfer", _process_transfer_event, num_blocks=volume_blocks_scan)
+                vol_df = get_recent_events_df(w3, pyusd_contract, "Transfer", _process_transfer_events, num_blocks=volume_blocks_scan)
                 st.session_state.volume_df = vol_df # Store result
 
         # Display results from state
@@ -2042,6 +2398,7 @@ if tab_ctx := get_tab("📈 Volume & Address Analysis"):
         if df_volume is not None:
              results_placeholder_volume_addr.empty()
              if not df_volume.empty and token_info:
+                 df_volume_plot = _plot_frame(df_volume) # Categorical addresses shared by the pie/graph groupbys below
                  # Calculate total volume
                  total_vol = calculate_transfer_volume_from_df(df_volume, token_info['symbol'])
                  st.metric(label=f"Total Volume ({token_info['symbol']}) | Last ~{volume_blocks_scan} Blocks",
@@ -2051,45 +2408,34 @@ if tab_ctx := get_tab("📈 Volume & Address Analysis"):
                  # --- Feature 11: AI Summarization ---
                  if gemini_model and len(df_volume) > 5: # Only summarize if data & AI available
                      if st.button("🤖 Summarize Volume Insights", key="summarize_volume_btn"):
-                         # Try to generate pie chart data for context, handle potential errors
-                         top_senders_labels = "N/A"; top_receivers_labels = "N/A"
-                         try:
-                             pie_from_fig = plot_top_addresses_pie(df_volume, token_info['symbol'], 'From', 3)
-                             if pie_from_fig: top_senders_labels = pie_from_fig.data[0]['labels'][:3]
-                         except Exception as pie_e1: print(f"Error generating sender pie for summary: {pie_e1}")
-                         try:
-                             pie_to_fig = plot_top_addresses_pie(df_volume, token_info['symbol'], 'To', 3)
-                             if pie_to_fig: top_receivers_labels = pie_to_fig.data[0]['labels'][:3]
-                         except Exception as pie_e2: print(f"Error generating receiver pie for summary: {pie_e2}")
-
-                         prompt = f"""Analyze the following PYUSD transfer data summary from the last {volume_blocks_scan} blocks and provide 2-3 key insights in a concise, cyberpunk-themed bulleted list:
-                         - Total Transfers: {len(df_volume)}
-                         - Total Volume: ${total_vol:,.2f} {token_info['symbol']}
-                         - Top 3 Senders (by Volume): {top_senders_labels}
-                         - Top 3 Receivers (by Volume): {top_receivers_labels}
-                         Focus on significant patterns or large movements. Be brief."""
+                         # Top counterparties for context, handle potential errors
+                         top_senders = (); top_receivers = ()
+                         try: top_senders = tuple(top_address_labels(df_volume_plot, token_info['symbol'], 'From', 3))
+                         except Exception as top_e1: print(f"Error computing top senders for summary: {top_e1}")
+                         try: top_receivers = tuple(top_address_labels(df_volume_plot, token_info['symbol'], 'To', 3))
+                         except Exception as top_e2: print(f"Error computing top receivers for summary: {top_e2}")
                          try:
                              with st.spinner("🧠 Generating AI summary..."):
-                                 response = gemini_model.generate_content(prompt)
-                                 st.info("🤖 AI Summary:")
-                                 st.markdown(clean_markdown(response.text))
+                                 summary = summarize_volume(volume_blocks_scan, token_info['symbol'], round(total_vol, 2), len(df_volume), top_senders, top_receivers)
+                             st.info("🤖 AI Summary:")
+                             st.markdown(summary)
                          except Exception as e_ai_sum:
                              st.error(f"AI Summary Error: {e_ai_sum}")
 
                  st.markdown("---")
-                 # Layout for charts
+                 # Layout for charts (built sequentially: cached st.cache_data builders need the script thread's context,
+                 # and Plotly figure construction holds the GIL, so worker threads would not overlap them anyway)
                  chart_col1_vol, chart_col2_vol = st.columns(2)
                  with chart_col1_vol:
                      with st.spinner("Generating volume/block chart..."): fig_vol_bar = plot_volume_per_block(df_volume, token_info['symbol'])
                      if fig_vol_bar: st.plotly_chart(fig_vol_bar, use_container_width=True)
 
-                     with st.spinner(f"Generating top {top_n_addresses} senders chart..."): fig_pie_from = plot_top_addresses_pie(df_volume, token_info['symbol'], 'From', top_n_addresses)
+                     with st.spinner(f"Generating top {top_n_addresses} senders chart..."): fig_pie_from = plot_top_addresses_pie(df_volume_plot, token_info['symbol'], 'From', top_n_addresses)
                      if fig_pie_from: st.plotly_chart(fig_pie_from, use_container_width=True)
 
                  with chart_col2_vol:
-                     # Placeholder for second column charts or info
                      # Top Receivers Pie Chart
-                     with st.spinner(f"Generating top {top_n_addresses} receivers chart..."): fig_pie_to = plot_top_addresses_pie(df_volume, token_info['symbol'], 'To', top_n_addresses)
+                     with st.spinner(f"Generating top {top_n_addresses} receivers chart..."): fig_pie_to = plot_top_addresses_pie(df_volume_plot, token_info['symbol'], 'To', top_n_addresses)
                      if fig_pie_to: st.plotly_chart(fig_pie_to, use_container_width=True)
 
 
@@ -2098,15 +2444,11 @@ if tab_ctx := get_tab("📈 Volume & Address Analysis"):
                  st.subheader("🕸️ PYUSD Transfer Network Graph")
                  st.caption(f"Showing top {top_n_addresses * 2} edges (approx) with volume >= ${graph_value_thresh:,.2f}. Interaction heavy.") # Adjust edge count estimate
                  with st.spinner("Generating network graph..."):
-                     graph_html_file = plot_network_graph(df_volume, token_info['symbol'], value_threshold=graph_value_thresh, top_n_edges=top_n_addresses * 2) # Pass threshold
+                     graph_html = plot_network_graph(df_volume_plot, token_info['symbol'], value_threshold=graph_value_thresh, top_n_edges=top_n_addresses * 2) # Pass threshold
 
-                 if graph_html_file:
+                 if graph_html:
                      try:
-                         with open(graph_html_file, 'r', encoding='utf-8') as HtmlFile:
-                             source_code = HtmlFile.read()
-                             components.html(source_code, height=610) # Adjust height as needed
-                     except FileNotFoundError:
-                         st.error("❌ Graph HTML file not found after generation.")
+                         components.html(graph_html, height=610) # Adjust height as needed
                      except Exception as e_graph:
                          st.error(f"❌ Error displaying graph: {e_graph}")
                  else:
@@ -2115,7 +2457,7 @@ if tab_ctx := get_tab("📈 Volume & Address Analysis"):
 
                  # --- Feature 9: Data Export ---
                  st.markdown("---")
-                 csv_data_vol = df_volume.to_csv(index=False).encode('utf-8')
+                 csv_data_vol = partial(df_to_csv_bytes, df_volume) # Encoded only when the button is clicked
                  st.download_button(
                       label="📥 Download Full Volume Analysis Data (CSV)",
                       data=csv_data_vol,
@@ -2157,8 +2499,10 @@ if tab_ctx := get_tab("🪙 Supply Events"):
 
         if fetch_supply and rpc_ok and contract_ok and token_info:
             with st.spinner(f"Scanning ~{supply_blocks_scan} blocks for Mint/Burn events..."):
-                 st.session_state.mint_df = get_recent_events_df(w3, pyusd_contract, "Mint", _process_mint_event, num_blocks=supply_blocks_scan)
-                 st.session_state.burn_df = get_recent_events_df(w3, pyusd_contract, "Burn", _process_burn_event, num_blocks=supply_blocks_scan)
+                 # Single eth_getLogs call for both event types
+                 supply_dfs = get_recent_events_dfs(w3, pyusd_contract, ("Mint", "Burn"), num_blocks=supply_blocks_scan)
+                 st.session_state.mint_df = supply_dfs["Mint"] if supply_dfs else None
+                 st.session_state.burn_df = supply_dfs["Burn"] if supply_dfs else None
 
         mint_df = st.session_state.get('mint_df')
         burn_df = st.session_state.get('burn_df')
@@ -2170,9 +2514,9 @@ if tab_ctx := get_tab("🪙 Supply Events"):
                 if mint_df is not None and not mint_df.empty:
                     display_cols_mint = ["Timestamp", "Block", "Tx Hash", "Recipient Tagged", f"Amount ({token_info['symbol']})"]
                     valid_cols_mint = [col for col in display_cols_mint if col in mint_df.columns]
-                    st.dataframe(mint_df[valid_cols_mint].head(50), hide_index=True, use_container_width=True)
+                    st.dataframe(mint_df.iloc[:50][valid_cols_mint], hide_index=True, use_container_width=True) # Rows first: only 50 rows get copied
                     # Export Mint Data
-                    csv_mint = mint_df.to_csv(index=False).encode('utf-8')
+                    csv_mint = partial(df_to_csv_bytes, mint_df) # Deferred: encoded on click
                     st.download_button("📥 Download Mint Data (CSV)", csv_mint, f"pyusd_mints_{supply_blocks_scan}blocks.csv", 'text/csv', key='download_mint_csv')
                 elif isinstance(mint_df, pd.DataFrame): st.info("No Mint events found in scan.")
                 else: st.warning("Error fetching Mint events.") # If None was returned
@@ -2182,9 +2526,9 @@ if tab_ctx := get_tab("🪙 Supply Events"):
                  if burn_df is not None and not burn_df.empty:
                      display_cols_burn = ["Timestamp", "Block", "Tx Hash", "Burner Tagged", f"Amount ({token_info['symbol']})"]
                      valid_cols_burn = [col for col in display_cols_burn if col in burn_df.columns]
-                     st.dataframe(burn_df[valid_cols_burn].head(50), hide_index=True, use_container_width=True)
+                     st.dataframe(burn_df.iloc[:50][valid_cols_burn], hide_index=True, use_container_width=True) # Rows first: only 50 rows get copied
                      # Export Burn Data
-                     csv_burn = burn_df.to_csv(index=False).encode('utf-8')
+                     csv_burn = partial(df_to_csv_bytes, burn_df) # Deferred: encoded on click
                      st.download_button("📥 Download Burn Data (CSV)", csv_burn, f"pyusd_burns_{supply_blocks_scan}blocks.csv", 'text/csv', key='download_burn_csv')
                  elif isinstance(burn_df, pd.DataFrame): st.info("No Burn events found in scan.")
                  else: st.warning("Error fetching Burn events.")
@@ -2194,29 +2538,34 @@ if tab_ctx := get_tab("🪙 Supply Events"):
                  st.markdown("---")
                  st.subheader("Net Supply Change in Scanned Blocks")
                  mint_amount_col = f"Amount ({token_info['symbol']})"
-                 supply_change_data = []
+                 blocks_parts, change_parts = [], []
 
                  if mint_df is not None and not mint_df.empty and 'Block' in mint_df.columns and mint_amount_col in mint_df.columns:
-                      mints = mint_df[['Block', mint_amount_col]].copy()
-                      mints['Change'] = pd.to_numeric(mints[mint_amount_col], errors='coerce')
-                      supply_change_data.append(mints[['Block', 'Change']])
+                      blocks_parts.append(mint_df['Block'].to_numpy(dtype=np.int64))
+                      change_parts.append(_as_numeric(mint_df[mint_amount_col]).to_numpy(dtype=np.float64))
 
                  if burn_df is not None and not burn_df.empty and 'Block' in burn_df.columns and mint_amount_col in burn_df.columns:
-                      burns = burn_df[['Block', mint_amount_col]].copy()
-                      burns['Change'] = -pd.to_numeric(burns[mint_amount_col], errors='coerce') # Negative for burns
-                      supply_change_data.append(burns[['Block', 'Change']])
-
-                 if supply_change_data:
-                      supply_change = pd.concat(supply_change_data).dropna(subset=['Change'])
-                      supply_change_grouped = supply_change.groupby('Block')['Change'].sum().reset_index()
-                      supply_change_grouped.sort_values('Block', inplace=True)
+                      blocks_parts.append(burn_df['Block'].to_numpy(dtype=np.int64))
+                      change_parts.append(-_as_numeric(burn_df[mint_amount_col]).to_numpy(dtype=np.float64)) # Negative for burns
+
+                 if blocks_parts:
+                      # Per-block sums over the bounded scan range with bincount (no frame copies, concat or groupby)
+                      blocks, changes = np.concatenate(blocks_parts), np.concatenate(change_parts)
+                      valid = ~np.isnan(changes)
+                      blocks, changes = blocks[valid], changes[valid]
+                      base_block = blocks.min() if blocks.size else 0
+                      offsets = blocks - base_block
+                      present = np.flatnonzero(np.bincount(offsets)) # Blocks with any mint/burn, kept even when they net to zero
+                      supply_change_grouped = pd.DataFrame({'Block': base_block + present,
+                                                            'Change': np.bincount(offsets, weights=changes)[present]})
 
                       if not supply_change_grouped.empty:
+                           import plotly.express as px # Lazy import: plotly loads on first chart render
                            fig_supply = px.bar(supply_change_grouped, x='Block', y='Change',
                                                 title=f"Net PYUSD Supply Change per Block (Last ~{supply_blocks_scan} Blocks)",
                                                 labels={'Block': 'Block Number', 'Change': f'Net Change (${token_info["symbol"]})'},
-                                                template='plotly_dark')
-                           fig_supply.update_layout(bargap=0.2, paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
+                                                template=PLOT_TEMPLATE)
+                           fig_supply.update_layout(bargap=0.2, **PLOT_BG)
                            st.plotly_chart(fig_supply, use_container_width=True)
                       else: st.info("Could not calculate net supply change (no valid mints/burns).")
                  else: st.info("No valid mint or burn data found to calculate net supply change.")
@@ -2249,29 +2598,30 @@ if tab_ctx := get_tab("🛡️ Approvals"):
 
         if fetch_appr and rpc_ok and contract_ok and token_info:
              with st.spinner(f"Scanning ~{appr_blocks_scan} blocks for Approval events..."):
-                 st.session_state.approval_df = get_recent_events_df(w3, pyusd_contract, "Approval", _process_approval_event, num_blocks=appr_blocks_scan)
+                 st.session_state.approval_df = get_recent_events_df(w3, pyusd_contract, "Approval", _process_approval_events, num_blocks=appr_blocks_scan)
 
         approval_df = st.session_state.get('approval_df')
 
         if approval_df is not None:
             if not approval_df.empty and token_info:
                  st.subheader("Recent Approvals")
-                 # Highlight unlimited approvals
-                 def highlight_unlimited(row):
-                     return ['background-color: rgba(255, 100, 100, 0.3)'] * len(row) if row['Unlimited'] else [''] * len(row)
+                 # Highlight unlimited approvals: one style matrix for the whole frame instead of a callback per row
+                 def highlight_unlimited(df):
+                     styles = np.where(df['Unlimited'].to_numpy(dtype=bool)[:, None], 'background-color: rgba(255, 100, 100, 0.3)', '')
+                     return pd.DataFrame(np.broadcast_to(styles, df.shape), index=df.index, columns=df.columns)
 
                  display_cols_appr = ["Timestamp", "Block", "Tx Hash", "Owner Tagged", "Spender Tagged", f"Amount ({token_info['symbol']})", "Unlimited"]
                  valid_cols_appr = [col for col in display_cols_appr if col in approval_df.columns]
-                 df_display_appr = approval_df[valid_cols_appr].head(100)
+                 df_display_appr = approval_df.iloc[:100][valid_cols_appr] # Rows first: only 100 rows get copied
 
                  st.dataframe(
-                     df_display_appr.style.apply(highlight_unlimited, axis=1), # Apply highlighting
+                     df_display_appr.style.apply(highlight_unlimited, axis=None) if 'Unlimited' in df_display_appr.columns else df_display_appr, # Apply highlighting
                      hide_index=True, use_container_width=True
                  )
                  st.caption("Rows highlighted in red indicate unlimited approvals.")
 
                  # Export Approval Data
-                 csv_appr = approval_df.to_csv(index=False).encode('utf-8')
+                 csv_appr = partial(df_to_csv_bytes, approval_df) # Deferred: encoded on click
                  st.download_button("📥 Download Approval Data (CSV)", csv_appr, f"pyusd_approvals_{appr_blocks_scan}blocks.csv", 'text/csv', key='download_appr_csv')
 
             elif isinstance(approval_df, pd.DataFrame): st.info("No Approval events found in scan.")
@@ -2301,20 +2651,15 @@ if tab_ctx := get_tab("💰 Balance Check"):
 
         if st.button("Check Balance", key="check_balance_btn", disabled=disable_balance_check, help=tooltip_balance):
             address_input_cleaned = address_to_check.strip()
-            target_address = None
 
-            # Try to resolve known label first
-            if address_input_cleaned:
-                for addr, label in KNOWN_ADDRESSES.items():
-                    # Case-insensitive label matching
-                    if label.lower() == address_input_cleaned.lower():
-                        target_address = addr
-                        st.info(f"Checking balance for label '{label}' ({addr[:8]}...)")
-                        break # Found label match
+            # Try to resolve known label first (case-insensitive, one dict lookup)
+            target_address = KNOWN_LABEL_TO_ADDRESS.get(address_input_cleaned.lower())
+            if target_address:
+                st.info(f"Checking balance for label '{KNOWN_ADDRESSES[target_address]}' ({target_address[:8]}...)")
 
             # If not a known label, assume it's an address
             if not target_address and address_input_cleaned:
-                 if Web3.is_address(address_input_cleaned):
+                 if is_valid_address(address_input_cleaned):
                      target_address = address_input_cleaned
                  else:
                      st.error(f"❌ Invalid Address or Unknown Label: `{address_input_cleaned}`")
@@ -2342,6 +2687,8 @@ if tab_ctx := get_tab("💰 Balance Check"):
 
 
 # --- Tab: Transaction Lookup ---
+TX_ADDRESS_FIELDS = frozenset({"From", "To", "Contract Address Created"}) # get_tx_details keys shown with their address label
+
 if tab_ctx := get_tab("🧾 Tx Lookup"):
      with tab_ctx:
         st.header("🧾 Transaction Details Lookup")
@@ -2356,7 +2703,7 @@ if tab_ctx := get_tab("🧾 Tx Lookup"):
 
         if st.button("🔍 Lookup Tx", key="lookup_tx_btn", disabled=disable_tx_lookup, help=tooltip_tx):
             tx_hash_lookup_cleaned = tx_hash_lookup.strip()
-            if tx_hash_lookup_cleaned and tx_hash_lookup_cleaned.startswith('0x') and len(tx_hash_lookup_cleaned) == 66:
+            if tx_hash_lookup_cleaned and _HEX_HASH.fullmatch(tx_hash_lookup_cleaned):
                 with st.spinner(f"⏳ Fetching details for `{tx_hash_lookup_cleaned[:10]}...` via GCP RPC..."):
                     tx_details = get_tx_details(w3, tx_hash_lookup_cleaned)
 
@@ -2367,28 +2714,20 @@ if tab_ctx := get_tab("🧾 Tx Lookup"):
                     elif status == "❌ Failed": st.error(f"❌ Tx `{short_hash}` failed execution.", icon="💥")
                     else: st.info(f"ℹ️ Tx `{short_hash}` details retrieved.")
 
-                    # Display details using tagged addresses where relevant
+                    # Display details in one pass, showing the tagged label in place of address fields
                     display_details = {}
                     for k, v in tx_details.items():
-                         val_str = str(v) if v is not None else "None"
-                         # Tag addresses
-                         if k in ["From", "To", "Contract Address Created"] and isinstance(v, str) and v != 'N/A' and Web3.is_address(v):
-                             display_details[f"{k} (Tagged)"] = get_address_label(v)
-                         display_details[k] = val_str
+                         if v is None:
+                             if k == "Contract Address Created": display_details[k] = "None" # Skip most Nones
+                         elif k in TX_ADDRESS_FIELDS and isinstance(v, str) and is_valid_address(v):
+                             display_details[k] = get_address_label(v)
+                         else: display_details[k] = str(v)
 
                     with st.expander("Show Transaction Details", expanded=True):
-                        cols_tx = st.columns(2); col_idx = 0
-                        for k, v in display_details.items():
-                             if v == "None" and k != "Contract Address Created": continue # Skip most Nones
-                             # Prioritize showing tagged address if available
-                             if k.endswith(" (Tagged)"): continue # Already handled by original key
-                             tagged_key = f"{k} (Tagged)"
-                             display_key = k
-                             display_val = display_details.get(tagged_key, v) # Use tagged value if exists
-
+                        cols_tx = st.columns(2)
+                        for col_idx, (display_key, display_val) in enumerate(display_details.items()):
                              cols_tx[col_idx % 2].text(f"{display_key}:")
                              cols_tx[col_idx % 2].code(display_val, language='text')
-                             col_idx += 1
                     st.markdown(f"👀 [View Transaction on Etherscan](https://etherscan.io/tx/{tx_hash_lookup_cleaned})", target="_blank")
                 # Error handled within get_tx_details
             elif tx_hash_lookup_cleaned: st.error(f"❌ Invalid Transaction Hash Format.")
@@ -2444,9 +2783,10 @@ if tab_ctx := get_tab("🔬 Block Trace"):
 
                     # Download button
                     try:
-                        # Use default=str for basic serialization fallback
-                        trace_str = json.dumps(block_trace, indent=2, default=str)
-                        st.download_button(label="📥 Download Full Trace (JSON)", data=trace_str, file_name=f"trace_{block_id_input_cleaned}.json", mime="application/json")
+                        # Encoded only on click, compact (multi-MB traces roughly triple in size when indented);
+                        # on_click="ignore" keeps the trace on screen instead of rerunning past the fetch button
+                        trace_json = partial(_json_dumps, block_trace)
+                        st.download_button(label="📥 Download Full Trace (JSON)", data=trace_json, file_name=f"trace_{block_id_input_cleaned}.json", mime="application/json", on_click="ignore")
                     except Exception as json_e: st.error(f"Failed to prepare trace data for download: {json_e}")
                 # Error messages handled within get_block_trace
             else: st.warning("⚠️ Please enter a block identifier.")
@@ -2482,16 +2822,18 @@ if tab_ctx := get_tab("🕰️ Historical Analysis"):
              options=["Transfer", "Mint", "Burn", "Approval"], # Add more if needed
              key="hist_event_type"
         )
+        hist_bloom_prefilter = st.checkbox("🌸 Bloom pre-filter (sparse ranges)", value=False, key="hist_bloom",
+                                           help="Checks each block header's logsBloom locally and only requests logs for candidate blocks. Faster when PYUSD activity in the range is rare; slower on busy ranges (one header per block).")
 
         disable_hist = not (rpc_ok and contract_ok and token_info)
         if st.button("⏳ Analyze Historical Range", key="hist_analyze_btn", disabled=disable_hist):
             if hist_end_block >= hist_start_block:
                 # Determine process function based on selected event type
                 process_func = None
-                if event_type_to_analyze == "Transfer": process_func = _process_transfer_event
-                elif event_type_to_analyze == "Mint": process_func = _process_mint_event
-                elif event_type_to_analyze == "Burn": process_func = _process_burn_event
-                elif event_type_to_analyze == "Approval": process_func = _process_approval_event
+                if event_type_to_analyze == "Transfer": process_func = _process_transfer_events
+                elif event_type_to_analyze == "Mint": process_func = _process_mint_events
+                elif event_type_to_analyze == "Burn": process_func = _process_burn_events
+                elif event_type_to_analyze == "Approval": process_func = _process_approval_events
 
                 if process_func:
                      # Clear previous results for this type
@@ -2501,7 +2843,7 @@ if tab_ctx := get_tab("🕰️ Historical Analysis"):
                      # Call the batched fetch function (will show spinner/warnings internally)
                      hist_df = get_historical_events_batched(
                          w3, pyusd_contract, event_type_to_analyze, process_func,
-                         hist_start_block, hist_end_block, hist_batch_size
+                         hist_start_block, hist_end_block, hist_batch_size, bloom_prefilter=hist_bloom_prefilter
                      )
                      st.session_state[session_key] = hist_df # Store result (even if None or empty)
                 else: st.error("Internal error: No processing function for selected event type.")
@@ -2515,23 +2857,27 @@ if tab_ctx := get_tab("🕰️ Historical Analysis"):
             st.markdown("---")
             st.subheader(f"Historical {event_type_to_analyze} Data ({hist_start_block} - {hist_end_block})")
             if hist_df_display is not None and not hist_df_display.empty and token_info:
-                 st.dataframe(hist_df_display.head(200), hide_index=True, use_container_width=True) # Show sample
+                 st.dataframe(_public_columns(hist_df_display.head(200)), hide_index=True, use_container_width=True) # Show sample
                  st.info(f"Displaying first 200 of {len(hist_df_display)} results.")
 
                  # Add basic plots for historical data if relevant (e.g., volume over time for Transfers)
                  if event_type_to_analyze == "Transfer" and 'Timestamp' in hist_df_display.columns and f"Value ({token_info['symbol']})" in hist_df_display.columns:
                      try:
-                         hist_plot_df = hist_df_display.copy()
-                         # Ensure timestamp is datetime and value is numeric for plotting
-                         hist_plot_df['Timestamp_DT'] = pd.to_datetime(hist_plot_df['Timestamp'], errors='coerce')
+                         # Integer day buckets + bincount instead of a datetime.date object column and groupby
                          value_col_hist = f"Value ({token_info['symbol']})"
-                         hist_plot_df[value_col_hist] = pd.to_numeric(hist_plot_df[value_col_hist], errors='coerce')
-                         hist_plot_df.dropna(subset=['Timestamp_DT', value_col_hist], inplace=True)
-
-                         if not hist_plot_df.empty:
-                             hist_plot_df['Date'] = hist_plot_df['Timestamp_DT'].dt.date
-                             daily_volume = hist_plot_df.groupby('Date')[value_col_hist].sum().reset_index()
-                             fig_hist_vol = px.line(daily_volume, x='Date', y=value_col_hist, title="Historical Daily Transfer Volume", template='plotly_dark')
+                         days = pd.to_datetime(hist_df_display['Timestamp'], format=TIMESTAMP_FORMAT, errors='coerce').to_numpy(dtype='datetime64[D]')
+                         values = _as_numeric(hist_df_display[value_col_hist]).to_numpy(dtype=np.float64)
+                         valid = ~np.isnat(days) & ~np.isnan(values)
+
+                         if valid.any():
+                             day_numbers = days[valid].astype(np.int64) # Days since epoch
+                             base_day = day_numbers.min()
+                             offsets = day_numbers - base_day
+                             present = np.flatnonzero(np.bincount(offsets)) # Days with at least one transfer
+                             daily_volume = pd.DataFrame({'Date': (base_day + present).astype('datetime64[D]'),
+                                                          value_col_hist: np.bincount(offsets, weights=values[valid])[present]})
+                             import plotly.express as px # Lazy import: plotly loads on first chart render
+                             fig_hist_vol = px.line(daily_volume, x='Date', y=value_col_hist, title="Historical Daily Transfer Volume", template=PLOT_TEMPLATE)
                              st.plotly_chart(fig_hist_vol, use_container_width=True)
                          else:
                              st.info("No valid data points to plot historical volume.")
@@ -2539,7 +2885,7 @@ if tab_ctx := get_tab("🕰️ Historical Analysis"):
                          st.warning(f"Could not plot historical volume: {e_hist_plot}")
 
                  # Export Historical Data
-                 csv_hist = hist_df_display.to_csv(index=False).encode('utf-8')
+                 csv_hist = partial(df_to_csv_bytes, hist_df_display) # Deferred: encoded on click
                  st.download_button(f"📥 Download Historical {event_type_to_analyze} Data (CSV)", csv_hist, f"pyusd_hist_{event_type_to_analyze}_{hist_start_block}-{hist_end_block}.csv", 'text/csv', key=f'download_hist_{event_type_to_analyze}_csv')
 
             elif isinstance(hist_df_display, pd.DataFrame): st.info("No events found in the specified historical range.")
@@ -2626,11 +2972,11 @@ if tab_ctx := get_tab("💳 Implant Sim"):
             if st.button("⚡ Tap Implant & Authorize Payment (Sim)", key="simulate_pay_btn", disabled=disable_sim, help=tooltip_sim):
                 implant_id = simulate_nfc_read()
                 user_wallet = get_user_wallet_address(implant_id)
-                merchant_valid = Web3.is_address(merchant_addr.strip())
+                merchant_valid = is_valid_address(merchant_addr.strip())
                 amount_valid = isinstance(amount_sim, (int, float)) and amount_sim > 0
 
                 if user_wallet and merchant_valid and amount_valid:
-                    cs_merchant = Web3.to_checksum_address(merchant_addr.strip())
+                    cs_merchant = to_checksum(merchant_addr.strip())
                     tx_sim = simulate_transaction_creation(user_wallet, cs_merchant, amount_sim, w3, pyusd_contract) # Assumes function exists
 
                     if tx_sim:
@@ -2640,7 +2986,7 @@ if tab_ctx := get_tab("💳 Implant Sim"):
                         with st.expander("Simulated GCP RPC Trace Result", expanded=False):
                             try:
                                  # Use default=str for basic serialization fallback
-                                 trace_sim_str = json.dumps(trace_sim, indent=2, default=str)
+                                 trace_sim_str = _json_dumps(trace_sim, indent=True)
                                  st.code(trace_sim_str, language="json")
                                  st.caption("Note: Trace structure is a simplified representation.")
                             except Exception as json_e_sim: st.error(f"Cannot display simulated trace: {json_e_sim}"); st.json(trace_sim)